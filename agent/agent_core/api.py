@@ -2,38 +2,112 @@
 Server API calls — heartbeat, break start/reason/end.
 
 All functions are blocking (called from worker threads, never from the main thread).
-Each has built-in retry (3 attempts, 2s→4s backoff) for Vercel cold-start resilience.
-On final failure, requests are saved to the offline buffer for later replay.
+Break calls retry (3 attempts, jittered exponential backoff) for Vercel cold-start resilience.
+On final failure, requests are saved to the offline buffer for later replay;
+a break step is also buffered while older ones are, so steps stay in order.
 """
 
 import time
+import uuid
+from functools import lru_cache
+from types import MappingProxyType
+
 import requests
-from datetime import datetime, timezone
 
 from .config import log
-from .constants import API_TIMEOUT_HEARTBEAT, API_TIMEOUT_BREAK
+from .constants import (
+    API_TIMEOUT_CONNECT, API_TIMEOUT_HEARTBEAT, API_TIMEOUT_HEARTBEAT_MIN, API_TIMEOUT_BREAK,
+)
 from . import http_client
 from . import network
 
+# Endpoint paths, appended to config["serverUrl"]
+_HEARTBEAT_PATH = "/api/agent/heartbeat"
+_BREAK_LOG_PATH = "/api/agent/break-log"
+
+
+def _auth_fields(config):
+    """
+    deviceId/deviceToken/empCode carried by every agent call, as a cached
+    read-only mapping; callers copy it into their payload with ** and add
+    only the per-call fields.
+    """
+    return _auth_mapping(config["deviceId"], config["deviceToken"], config["empCode"])
+
+
+@lru_cache(maxsize=4)
+def _auth_mapping(device_id, device_token, emp_code):
+    # Keyed by the values themselves, not stored on the (persisted) config
+    # dict, so a changed token or re-enroll never gets a stale mapping.
+    return MappingProxyType({
+        "deviceId": device_id,
+        "deviceToken": device_token,
+        "empCode": emp_code,
+    })
+
+
+def _endpoint(config, path):
+    """Full URL for an endpoint path (cached per server URL and path)."""
+    return _endpoint_url(config["serverUrl"], path)
+
+
+@lru_cache(maxsize=8)
+def _endpoint_url(server_url, path):
+    return server_url + path
+
+
+def _idempotency_headers(config, *parts):
+    """
+    Idempotency-Key header for one logical call. Built once per call and
+    reused by every resend of it — retry or offline-buffer replay (the
+    buffer stores the headers) — so the server skips the duplicates.
+    """
+    return {"Idempotency-Key": ":".join((config["deviceId"], *map(str, parts)))}
+
+
+def _body_snippet(resp):
+    """
+    First 200 bytes of an error body for the log. Decoded as UTF-8 directly:
+    resp.text would run requests' charset detection over the whole body
+    when the server omits a charset.
+    """
+    return resp.content[:200].decode("utf-8", "replace")
+
 
 # ─── Heartbeat ───────────────────────────────────────────────────
 
 def send_heartbeat(config, state_str, activity_score=None, autoclicker_detected=False):
     """Send ACTIVE/IDLE heartbeat. Returns True on success."""
-    url = f"{config['serverUrl']}/api/agent/heartbeat"
+    url = _endpoint(config, _HEARTBEAT_PATH)
     payload = {
-        "deviceId": config["deviceId"],
-        "deviceToken": config["deviceToken"],
-        "empCode": config["empCode"],
+        **_auth_fields(config),
         "state": state_str,
     }
     if activity_score is not None:
         payload["activityScore"] = activity_score
     if autoclicker_detected:
         payload["autoClickerDetected"] = True
+    # Random per heartbeat: two real heartbeats can share a state and a
+    # clock second (lock/unlock ticks, restarts, clock steps).
+    headers = _idempotency_headers(config, uuid.uuid4().hex)
 
+    breaker = http_client.breaker
+    if not breaker.allow():
+        log.warning("Heartbeat skipped: server circuit open")
+        network.buffer_request("POST", url, payload, headers)
+        return False
+
+    # Short connect timeout; read timeout follows observed server latency,
+    # so a stalled request frees the sender quickly but a slow backend
+    # (cold starts) gets more room on the following heartbeats.
+    latency = http_client.heartbeat_latency
+    read_timeout = latency.timeout(API_TIMEOUT_HEARTBEAT_MIN, API_TIMEOUT_HEARTBEAT)
     try:
-        resp = http_client.http.post(url, json=payload, timeout=API_TIMEOUT_HEARTBEAT)
+        body = http_client.encode_json(payload)
+        resp = http_client.http.post(url, data=body, headers=headers,
+                                     timeout=(API_TIMEOUT_CONNECT, read_timeout))
+        breaker.record_response(resp)
+        latency.observe(resp.elapsed.total_seconds())
         if resp.status_code == 200:
             data = resp.json()
             action = data.get("action", "unknown")
@@ -44,110 +118,216 @@ def send_heartbeat(config, state_str, activity_score=None, autoclicker_detected=
             log.error("Heartbeat REJECTED (401) — device may be revoked")
             return False
         else:
-            log.warning("Heartbeat failed: HTTP %d — %s", resp.status_code, resp.text[:200])
+            log.warning("Heartbeat failed: HTTP %d — %s", resp.status_code, _body_snippet(resp))
             return False
     except requests.RequestException as e:
+        breaker.record_failure()
+        if isinstance(e, requests.ReadTimeout):
+            latency.observe(read_timeout)
         log.warning("Heartbeat network error: %s", e)
-        network.buffer_request("POST", url, payload)
+        network.buffer_request("POST", url, payload, headers)
         return False
 
 
 # ─── Break API (3-step lifecycle) ────────────────────────────────
 
-def send_break_start(config, break_start_time):
-    """Step 1: Create an open break in DB when popup appears."""
-    url = f"{config['serverUrl']}/api/agent/break-log"
-    started_iso = (
-        datetime.fromtimestamp(break_start_time, tz=timezone.utc)
-        .isoformat()
-        .replace("+00:00", "Z")
-    )
-    payload = {
-        "deviceId": config["deviceId"],
-        "deviceToken": config["deviceToken"],
-        "empCode": config["empCode"],
-        "reason": "Pending",
-        "customReason": "Waiting for employee to submit reason",
-        "startedAt": started_iso,
-    }
+@lru_cache(maxsize=4)
+def _to_iso_z(ts):
+    """
+    Epoch seconds → 'YYYY-MM-DDTHH:MM:SSZ' (UTC) in one C-level call.
+    Cached: every step of a break formats the same start time (payload and
+    Idempotency-Key), so it is built once per break.
+    """
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def _break_headers(config, break_start_time):
+    if break_start_time is None:
+        return None
+    return _idempotency_headers(config, _to_iso_z(break_start_time))
+
+
+_RETRY_AFTER_MAX = 30.0
+
+# _request_with_retry result for a call the server refused outright: the
+# caller must not buffer it, since a replay would only be refused again (or,
+# worse, land on a later break).
+_REJECTED = object()
+
+
+def _retry_after(resp, default):
+    """Server-requested delay from a numeric Retry-After header, else default."""
+    try:
+        return min(_RETRY_AFTER_MAX, max(0.0, float(resp.headers["Retry-After"])))
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+def _request_with_retry(method, url, payload, what, headers=None):
+    """
+    Send a break-log call with up to 3 attempts. Returns the 200 response,
+    _REJECTED, or None (not delivered; the caller buffers it).
 
+    Only network errors (requests.RequestException), 429 and 5xx are
+    retried; anything else raised here is a bug and propagates. While the
+    circuit breaker is open it gives up at once. Any other 4xx (revoked
+    device, no open break, validation) will not change on a resend, so it
+    is logged once and returned as _REJECTED straight away.
+    """
+    breaker = http_client.breaker
+    body = http_client.encode_json(payload)     # encoded once, reused per attempt
     for attempt in range(3):
+        if not breaker.allow():
+            log.warning("%s skipped: server circuit open", what)
+            return None
+        delay = http_client.backoff_delay(attempt)
         try:
-            resp = http_client.http.post(url, json=payload, timeout=API_TIMEOUT_BREAK)
-            if resp.status_code == 200:
-                log.info("Break opened in DB (form appeared)")
-                return True
-            log.warning("Break start failed (attempt %d): HTTP %d", attempt + 1, resp.status_code)
-        except Exception as e:
-            log.warning("Break start error (attempt %d): %s", attempt + 1, e)
+            resp = http_client.http.request(method, url, data=body, headers=headers,
+                                            timeout=(API_TIMEOUT_CONNECT, API_TIMEOUT_BREAK))
+            breaker.record_response(resp)
+            status = resp.status_code
+            if status == 200:
+                return resp
+            if http_client.is_permanent_rejection(status):
+                log.error("%s rejected: HTTP %d — %s", what, status, _body_snippet(resp))
+                return _REJECTED
+            log.warning("%s failed (attempt %d): HTTP %d", what, attempt + 1, status)
+            delay = _retry_after(resp, delay)
+        except requests.RequestException as e:
+            breaker.record_failure()
+            log.warning("%s error (attempt %d): %s", what, attempt + 1, e)
         if attempt < 2:
-            time.sleep(2 * (attempt + 1))
+            time.sleep(delay)
+    return None
 
-    log.error("Break start FAILED after 3 attempts — buffering")
-    network.buffer_request("POST", url, payload)
+
+def _behind_buffer():
+    """
+    True if older calls are still in the offline buffer after trying to
+    flush them. A live break step would overtake them — e.g. an end
+    reaching the server before its buffered start, refused there with a
+    409 — so the caller buffers it behind them instead.
+    """
+    if not network.has_buffered_requests():
+        return False
+    network.flush_buffer(wait=True)
+    if network.has_buffered_requests():
+        log.info("Offline buffer not drained — queueing break step behind it")
+        return True
     return False
 
 
-def send_break_reason(config, reason, custom_reason):
-    """Step 2: Update the open break with employee's chosen reason."""
+# send_break_start outcomes. The end step must follow the start: sent live
+# after a SENT start, buffered behind a BUFFERED one, skipped after REFUSED
+# (the server will never have that break, so an end could only get a 409).
+BREAK_SENT = "sent"
+BREAK_BUFFERED = "buffered"
+BREAK_REFUSED = "refused"
+
+
+def send_break_start(config, break_start_time, reason="Pending",
+                     custom_reason="Waiting for employee to submit reason"):
+    """
+    Step 1: Create an open break in DB when popup appears.
+
+    When the reason is already known (auto-detected breaks) pass it here;
+    the server stores it on create, which saves the step-2 PATCH.
+
+    All three steps of one break share an Idempotency-Key derived from its
+    start time, so steps 2 and 3 should be given the same break_start_time.
+
+    The call is buffered rather than sent while older calls are still
+    buffered (see _behind_buffer). Returns BREAK_SENT, BREAK_BUFFERED or
+    BREAK_REFUSED.
+    """
+    url = _endpoint(config, _BREAK_LOG_PATH)
+    started_iso = _to_iso_z(break_start_time)
+    headers = _break_headers(config, break_start_time)
+    payload = {
+        **_auth_fields(config),
+        "reason": reason,
+        "customReason": custom_reason,
+        "startedAt": started_iso,
+    }
+
+    if _behind_buffer():
+        network.buffer_request("POST", url, payload, headers)
+        return BREAK_BUFFERED
+
+    result = _request_with_retry("POST", url, payload, "Break start", headers)
+    if result is _REJECTED:
+        return BREAK_REFUSED
+    if result is not None:
+        log.info("Break opened in DB (reason=%s)", reason)
+        return BREAK_SENT
+
+    log.error("Break start not delivered — buffering")
+    network.buffer_request("POST", url, payload, headers)
+    return BREAK_BUFFERED
+
+
+def send_break_reason(config, reason, custom_reason, break_start_time=None):
+    """
+    Step 2: Update the open break with employee's chosen reason.
+    Buffering as for send_break_start.
+    """
     reason = (reason or "").strip()
     custom_reason = (custom_reason or "").strip()
     if not reason or not custom_reason:
         log.warning("Break reason update skipped: reason/custom reason is required")
         return False
 
-    url = f"{config['serverUrl']}/api/agent/break-log"
+    url = _endpoint(config, _BREAK_LOG_PATH)
     payload = {
-        "deviceId": config["deviceId"],
-        "deviceToken": config["deviceToken"],
-        "empCode": config["empCode"],
+        **_auth_fields(config),
         "action": "update-reason",
         "reason": reason,
         "customReason": custom_reason,
     }
+    headers = _break_headers(config, break_start_time)
 
-    for attempt in range(3):
-        try:
-            resp = http_client.http.patch(url, json=payload, timeout=API_TIMEOUT_BREAK)
-            if resp.status_code == 200:
-                log.info("Break reason updated: %s — %s", reason, custom_reason)
-                return True
-            log.warning("Break reason update failed (attempt %d): HTTP %d", attempt + 1, resp.status_code)
-        except Exception as e:
-            log.warning("Break reason update error (attempt %d): %s", attempt + 1, e)
-        if attempt < 2:
-            time.sleep(2 * (attempt + 1))
+    if _behind_buffer():
+        network.buffer_request("PATCH", url, payload, headers)
+        return True
+
+    result = _request_with_retry("PATCH", url, payload, "Break reason update", headers)
+    if result is _REJECTED:
+        return False
+    if result is not None:
+        log.info("Break reason updated: %s — %s", reason, custom_reason)
+        return True
 
-    log.error("Break reason update FAILED after 3 attempts — buffering (will sync when online)")
-    network.buffer_request("PATCH", url, payload)
+    log.error("Break reason update not delivered — buffering (will sync when online)")
+    network.buffer_request("PATCH", url, payload, headers)
     # Returning True keeps the popup flow non-blocking while preserving data in
     # the offline buffer. The request will be replayed by flush_buffer().
     return True
 
 
-def send_break_end(config):
-    """Step 3: Close the open break when employee becomes active."""
-    url = f"{config['serverUrl']}/api/agent/break-log"
+def send_break_end(config, break_start_time=None, *, buffer_only=False):
+    """
+    Step 3: Close the open break when employee becomes active.
+    Buffering as for send_break_start; buffer_only=True forces it (to
+    follow a start that was buffered).
+    """
+    url = _endpoint(config, _BREAK_LOG_PATH)
     payload = {
-        "deviceId": config["deviceId"],
-        "deviceToken": config["deviceToken"],
-        "empCode": config["empCode"],
+        **_auth_fields(config),
         "action": "end-break",
     }
+    headers = _break_headers(config, break_start_time)
 
-    for attempt in range(3):
-        try:
-            resp = http_client.http.patch(url, json=payload, timeout=API_TIMEOUT_BREAK)
-            if resp.status_code == 200:
-                data = resp.json()
-                log.info("Break ended: %s", data.get("message", ""))
-                return True
-            log.warning("Break end failed (attempt %d): HTTP %d", attempt + 1, resp.status_code)
-        except Exception as e:
-            log.warning("Break end error (attempt %d): %s", attempt + 1, e)
-        if attempt < 2:
-            time.sleep(2 * (attempt + 1))
+    if buffer_only or _behind_buffer():
+        network.buffer_request("PATCH", url, payload, headers)
+        return False
+
+    resp = _request_with_retry("PATCH", url, payload, "Break end", headers)
+    if resp is _REJECTED:
+        return False
+    if resp is not None:
+        log.info("Break ended: %s", resp.json().get("message", ""))
+        return True
 
-    log.error("Break end FAILED after 3 attempts — buffering")
-    network.buffer_request("PATCH", url, payload)
+    log.error("Break end not delivered — buffering")
+    network.buffer_request("PATCH", url, payload, headers)
     return False
@@ -5,7 +5,8 @@ All state, idle detection, heartbeat, popup lifecycle, connectivity
 monitoring, and lock detection run inside Tkinter's event loop via
 root.after(). Zero busy-wait loops.
 
-Background threads: ONLY pynput listeners + short-lived API call threads.
+Background threads: pynput listeners, the lock watcher, the heartbeat
+sender and the break-log worker (which also replays the offline buffer).
 None of them touch Tkinter directly.
 """
 
@@ -13,12 +14,14 @@ import queue
 import threading
 import time
 import tkinter as tk
-from datetime import datetime, timezone, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from .constants import (
     AGENT_VERSION, IDLE_THRESHOLD_SEC, HEARTBEAT_INTERVAL_SEC,
-    CONNECTIVITY_CHECK_SEC, ALIVE_SAVE_SEC, DOWNTIME_MIN_GAP_SEC,
-    AUTOCLICKER_CHECK_SEC, AUTOCLICKER_PROCESSES, SHIFT_REFRESH_SEC, THEME,
+    CONNECTIVITY_CHECK_SEC, ALIVE_SAVE_SEC,
+    AUTOCLICKER_CHECK_SEC, AUTOCLICKER_PROCESSES, SHIFT_REFRESH_SEC, THEME, PKT,
 )
 from .config import log, safe_print
 from .state import AgentState
@@ -27,35 +30,64 @@ from .listeners import InputListeners
 from .popup import IdlePopup
 from .platform_win import (
     is_system_locked, get_system_idle_seconds, detect_autoclicker_processes,
+    start_lock_watcher, stop_lock_watcher, consume_lock_change,
+)
+from .api import (
+    send_heartbeat, send_break_start, send_break_reason, send_break_end,
+    BREAK_SENT, BREAK_BUFFERED,
 )
-from .api import send_heartbeat, send_break_start, send_break_end, send_break_reason
 from . import http_client
 from . import network
 
-_PKT = timezone(timedelta(hours=5))
+_INPUT_QUEUE_MAX = 4096
+_LISTENER_CHECK_SEC = 30
+_POLL_MS = 200          # while input is arriving
+_IDLE_POLL_MS = 1000    # after a pass that found no input
+_SYS_IDLE_CHECK_AFTER_SEC = 60   # pynput-idle seconds before asking the OS
+_TICK_TRACEBACK_EVERY_SEC = 60   # a failing tick logs its traceback at most this often
+_HB_FAILURES_BEFORE_CHECK = 2   # failed heartbeats before the socket-level check
 
 
 class AgentApp:
     """
-    Owns the Tk main loop. Schedules everything via root.after():
-      _poll_input()      — drains pynput queue, updates state    (every 200ms)
-      _tick()            — idle/lock/heartbeat logic             (every 3s)
-      _check_connectivity() — online/offline transitions         (every 15s)
-      _save_alive()      — persist alive timestamp               (every 30s)
-      _check_listeners() — restarts dead pynput listeners        (every 30s)
+    Owns the Tk main loop. One root.after() timer drives everything:
+      _poll_input()      — 200ms, 1s when no input (500ms popup up), runs:
+        _drain_queue()   — drains pynput deque + counts, updates state (every pass)
+        _tick()          — idle/lock/heartbeat logic             (every 3s, early on lock change)
+        _check_connectivity() — online/offline transitions       (every 15s)
+        _check_listeners() — restarts dead pynput listeners      (every 30s)
+        _save_alive()    — persist alive timestamp               (every 30s)
+        _check_autoclicker() — cheat process scan                (every 60s)
+        _refresh_shift_info() — re-fetch shift window            (every 10 min)
 
     The root window is hidden (withdrawn). The popup is a Toplevel child.
     """
 
     def __init__(self, config):
         self._config = config
+        # Server-assigned at enrollment; fixed for the life of the app
+        self._hb_interval = config.get("heartbeatIntervalSec", HEARTBEAT_INTERVAL_SEC)
         self.state = AgentState()
         self._tracker = ActivityTracker()
-        self._input_queue = queue.Queue()
+        # Newest input matters most: on overflow the oldest events fall off
+        self._input_queue = deque(maxlen=_INPUT_QUEUE_MAX)
         self._listeners = InputListeners(self._input_queue)
         self._root = None
         self._popup = None
-        self._break_end_in_flight = False
+        self._next_tick_at = 0.0        # time.monotonic() deadline, driven by _poll_input
+        self._tick_traceback_at = None  # time.monotonic() of the last logged tick traceback
+        self._periodic = []             # [next_due, period_sec, fn], run by _poll_input
+        self._break_end_future = None
+        self._break_start_future = None
+        # One long-lived worker for every /break-log call (start, popup
+        # reason, end): calls run in submit order, so a reason or end can
+        # never overtake the break-start it belongs to. Heartbeats stay off
+        # this worker so a slow heartbeat can't delay a break call.
+        self._break_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="break-log")
+        # Heartbeat bulkhead: one sender thread fed by a tiny queue. A stalled
+        # server can't pile up threads; stale entries are dropped, newest wins.
+        self._hb_queue = queue.Queue(maxsize=2)
+        self._hb_thread = None
         self._autoclicker_detected = []   # list of detected process names
         self._autoclicker_warned = False   # True once warning popup has been shown
         self._cheat_warning_top = None     # Toplevel for the warning popup
@@ -65,21 +97,31 @@ class AgentApp:
         self._root = tk.Tk()
         self._root.withdraw()
 
-        self._popup = IdlePopup(self._root, self._config, self._on_popup_submitted)
+        self._popup = IdlePopup(
+            self._root, self._config, self._on_popup_submitted, self._submit_popup_reason,
+        )
         self._listeners.start()
+        start_lock_watcher()
+        self._hb_thread = threading.Thread(
+            target=self._heartbeat_worker, name="heartbeat", daemon=True,
+        )
+        self._hb_thread.start()
 
         # Schedule recurring tasks
+        now = time.monotonic()
+        self._next_tick_at = now + 3.0
+        self._periodic = [
+            [now + CONNECTIVITY_CHECK_SEC, CONNECTIVITY_CHECK_SEC, self._check_connectivity],
+            [now + _LISTENER_CHECK_SEC, _LISTENER_CHECK_SEC, self._check_listeners],
+            [now + ALIVE_SAVE_SEC, ALIVE_SAVE_SEC, self._save_alive],
+            [now + 5, AUTOCLICKER_CHECK_SEC, self._check_autoclicker],  # first scan after 5s
+            [now + SHIFT_REFRESH_SEC, SHIFT_REFRESH_SEC, self._refresh_shift_info],
+        ]
         self._root.after(200, self._poll_input)
-        self._root.after(3000, self._tick)
-        self._root.after(CONNECTIVITY_CHECK_SEC * 1000, self._check_connectivity)
-        self._root.after(ALIVE_SAVE_SEC * 1000, self._save_alive)
-        self._root.after(30000, self._check_listeners)
-        self._root.after(5000, self._check_autoclicker)  # first scan after 5s
-        self._root.after(SHIFT_REFRESH_SEC * 1000, self._refresh_shift_info)
 
         log.info(
             "v%s started (idle=%ds, hb=%ds, shift=%s→%s)",
-            AGENT_VERSION, IDLE_THRESHOLD_SEC, HEARTBEAT_INTERVAL_SEC,
+            AGENT_VERSION, IDLE_THRESHOLD_SEC, self._hb_interval,
             self.state.shift_start or "always-on",
             self.state.shift_end or "always-on",
         )
@@ -89,6 +131,11 @@ class AgentApp:
             self._root.mainloop()
         finally:
             self._listeners.stop()
+            stop_lock_watcher()
+            self._enqueue_heartbeat(None)   # let the sender thread exit
+            # Queued break calls still complete (not cancelled); the worker
+            # thread then exits instead of idling on after an auto-restart.
+            self._break_pool.shutdown(wait=False)
             network.save_alive_ts(self._config["empCode"])
             log.info("AgentApp shut down.")
 
@@ -105,76 +152,130 @@ class AgentApp:
         Check if the current time (PKT) falls within the employee's shift.
         Returns True if no shift info is available (always-on fallback).
         """
-        if not self.state.shift_start or not self.state.shift_end:
+        start = self.state.shift_start_min
+        end = self.state.shift_end_min
+        if start is None or end is None:
             return True
 
-        now = datetime.now(_PKT)
-        current = now.strftime("%H:%M")
-        start = self.state.shift_start
-        end = self.state.shift_end
+        now = datetime.now(PKT)
+        current = now.hour * 60 + now.minute
 
         if self.state.shift_crosses_midnight:
             return current >= start or current < end
         return start <= current < end
 
-    # ─── Input polling (every 200ms) ─────────────────────────
+    # ─── Input polling (200ms; backs off to 1s without input) ─
 
     def _poll_input(self):
+        """
+        The agent's only timer: drains input every pass and runs the tick
+        and the periodic tasks when their deadlines come due, instead of
+        each keeping its own after() chain.
+        """
+        busy = True
         try:
-            self._drain_queue()
+            busy = self._drain_queue() or bool(self._input_queue)
         except Exception as e:
             log.error("_poll_input error: %s", e)
 
-        interval = 500 if self.state.popup_visible else 200
+        now = time.monotonic()
+        # Lock/unlock is pushed by the WTS watcher: run the tick now rather
+        # than up to 3s later, so the unlock popup appears immediately.
+        if consume_lock_change() or now >= self._next_tick_at:
+            self._tick(now)
+        for task in self._periodic:
+            if now >= task[0]:
+                task[0] = now + task[1]
+                task[2]()
+
+        if self.state.popup_visible:
+            interval = 500
+        elif busy:
+            interval = _POLL_MS
+        else:
+            # Nothing to drain: sleep longer, but never past the tick deadline
+            # so the idle threshold is still hit on time.
+            until_tick = int((self._next_tick_at - time.monotonic()) * 1000)
+            interval = max(_POLL_MS, min(_IDLE_POLL_MS, until_tick))
         self._root.after(interval, self._poll_input)
 
     def _drain_queue(self):
+        """Feed queued input to the tracker. Returns True if any was drained."""
         if self.state.popup_visible:
-            try:
-                while True:
-                    self._input_queue.get_nowait()
-            except queue.Empty:
-                pass
-            return
-
-        had_input = False
-        batch = 0
-        while batch < 200:
-            try:
-                event = self._input_queue.get_nowait()
-            except queue.Empty:
-                break
-            batch += 1
-            had_input = True
-            kind = event[0]
+            self._input_queue.clear()
+            self._listeners.take_counts()
+            return False
+
+        keys, scrolls = self._listeners.take_counts()
+        if keys:
+            self._tracker.on_key_event(keys)
+        if scrolls:
+            self._tracker.on_mouse_scroll(scrolls)
+
+        # Only moves and clicks are queued, all as (kind, x, y, ts). This is
+        # the sole consumer, so the length read up front can only grow.
+        batch = min(len(self._input_queue), 200)
+        popleft = self._input_queue.popleft
+        on_move = self._tracker.on_mouse_move
+        on_click = self._tracker.on_mouse_click
+        for _ in range(batch):
+            kind, x, y, ts = popleft()
             if kind == "move":
-                self._tracker.on_mouse_move(event[1], event[2], event[3])
-            elif kind == "click":
-                self._tracker.on_mouse_click(event[1], event[2], event[3])
-            elif kind == "scroll":
-                self._tracker.on_mouse_scroll()
-            elif kind == "key":
-                self._tracker.on_key_event()
+                on_move(x, y, ts)
+            else:
+                on_click(x, y, ts)
+
+        had_input = bool(keys or scrolls or batch)
 
         if had_input:
-            self.state.record_activity()
+            now = time.monotonic()
+            was_idle = self.state.idle_seconds_at(now) >= IDLE_THRESHOLD_SEC
+            self.state.record_activity(now)
+            if was_idle:
+                # IDLE → ACTIVE without a popup (e.g. one was already shown
+                # this idle stretch): tick now so the ACTIVE heartbeat isn't
+                # left waiting for the 3s cadence.
+                self._next_tick_at = 0.0
 
             if self.state.awaiting_first_activity:
                 log.info("Real activity detected after popup — ending break")
                 self.state.on_user_active()
                 self._send_break_end_async()
+                # Tick in this same poll pass: the ACTIVE heartbeat goes out
+                # alongside the break end (both on warm pooled connections)
+                # instead of up to 3s later.
+                self._next_tick_at = 0.0
+        return had_input
 
     # ─── Tick: idle / lock / heartbeat (every 3s) ────────────
 
-    def _tick(self):
+    def _tick(self, now):
+        """`now` is the caller's time.monotonic(), read once per poll pass."""
         try:
-            self._do_tick()
+            self._do_tick(now)
         except Exception as e:
-            log.error("_tick error: %s", e, exc_info=True)
-        self._root.after(3000, self._tick)
-
-    def _do_tick(self):
-        now = time.time()
+            # A persistently failing tick would otherwise write a full
+            # traceback every 3s; keep one per minute, one line otherwise.
+            last = self._tick_traceback_at
+            if last is None or now - last >= _TICK_TRACEBACK_EVERY_SEC:
+                self._tick_traceback_at = now
+                log.error("_tick error: %s", e, exc_info=True)
+            else:
+                log.error("_tick error (traceback suppressed): %s", e)
+        self._next_tick_at = now + self._next_tick_delay(now)
+
+    def _next_tick_delay(self, now):
+        """3s cadence, shortened so the tick lands right on the idle threshold."""
+        if not self.state.can_show_popup():
+            return 3.0
+        remaining = IDLE_THRESHOLD_SEC - self.state.idle_seconds_at(now)
+        if 0 < remaining < 3:
+            return remaining
+        return 3.0
+
+    def _do_tick(self, now):
+        # `now` is monotonic: deltas only; wall clock can step (NTP, manual changes)
+        state = self.state
 
         # Skip idle/heartbeat logic outside shift hours
         if not self._is_within_shift():
@@ -183,29 +284,33 @@ class AgentApp:
         # ── System-level idle supplement ──────────
         # pynput can't see input from elevated (admin) windows.
         # GetLastInputInfo reports OS-level idle regardless of elevation.
-        sys_idle = get_system_idle_seconds()
-        if sys_idle >= 0 and not self.state.popup_visible:
-            if sys_idle < self.state.idle_seconds - 5:
-                self.state.record_activity()
+        # Only asked once pynput has been quiet for a while — before that it
+        # can't change the outcome, and idle detection is minutes away.
+        idle_secs = state.idle_seconds_at(now)
+        if idle_secs > _SYS_IDLE_CHECK_AFTER_SEC and not state.popup_visible:
+            sys_idle = get_system_idle_seconds()
+            if 0 <= sys_idle < idle_secs - 5:
+                state.record_activity(now)
 
         # ── Lock detection ────────────────────────
+        # After this block state.system_locked == locked; the rest uses the local.
         locked = is_system_locked()
 
-        if locked and not self.state.system_locked:
-            self.state.system_locked = True
-            self.state.was_locked = True
-            self.state.lock_popup_handled = False
-            self.state.lock_start_time = now
+        if locked and not state.system_locked:
+            state.system_locked = True
+            state.was_locked = True
+            state.lock_popup_handled = False
+            state.lock_start_time = now
             log.info("System LOCKED — marking IDLE")
 
-        elif not locked and self.state.system_locked:
-            self.state.system_locked = False
-            lock_duration = now - self.state.lock_start_time
+        elif not locked and state.system_locked:
+            state.system_locked = False
+            lock_duration = now - state.lock_start_time
             log.info("System UNLOCKED (locked for %.0fs)", lock_duration)
 
         # ── Determine current state ──────────────
-        idle_secs = self.state.idle_seconds
-        if self.state.system_locked or idle_secs >= IDLE_THRESHOLD_SEC:
+        idle_secs = state.idle_seconds_at(now)
+        if locked or idle_secs >= IDLE_THRESHOLD_SEC:
             current = "IDLE"
         else:
             current = "ACTIVE"
@@ -213,60 +318,92 @@ class AgentApp:
         # Log approaching idle (once, at ~170s)
         if 170 <= idle_secs < 173 and current == "ACTIVE":
             log.info("Approaching idle: %.0fs (threshold=%ds, can_popup=%s)",
-                     idle_secs, IDLE_THRESHOLD_SEC, self.state.can_show_popup())
+                     idle_secs, IDLE_THRESHOLD_SEC, state.can_show_popup())
 
         # ── Unlock → immediate popup (real locks only) ──
-        if (self.state.was_locked
-                and not self.state.system_locked
-                and not self.state.lock_popup_handled):
-            self.state.lock_popup_handled = True
-            log.info("Lock popup check: can_show=%s", self.state.can_show_popup())
-            if self.state.can_show_popup():
+        if (state.was_locked
+                and not locked
+                and not state.lock_popup_handled):
+            state.lock_popup_handled = True
+            log.info("Lock popup check: can_show=%s", state.can_show_popup())
+            if state.can_show_popup():
                 self._show_popup()
 
         # ── Idle timeout → popup ─────────────────
         if (current == "IDLE"
-                and not self.state.system_locked
+                and not locked
                 and idle_secs >= IDLE_THRESHOLD_SEC
-                and self.state.can_show_popup()):
+                and state.can_show_popup()):
             log.info("Idle threshold reached (%.0fs) — showing popup", idle_secs)
             self._show_popup()
 
         # ── Heartbeat ────────────────────────────
-        interval = self._config.get("heartbeatIntervalSec", HEARTBEAT_INTERVAL_SEC)
-        score = None
         cheat_flag = bool(self._autoclicker_detected)
         hb_state = current
-        if current == "ACTIVE":
+        if current == "ACTIVE" and cheat_flag:
+            hb_state = "SUSPICIOUS"
+
+        state_changed = hb_state != state.last_heartbeat_state
+        interval_elapsed = (now - state.last_heartbeat_time) >= self._hb_interval
+        if not (state_changed or interval_elapsed):
+            return
+
+        # Score only when a heartbeat actually goes out, so the tracker's
+        # window spans the whole heartbeat interval rather than the last tick.
+        score = None
+        if hb_state == "SUSPICIOUS":
+            score = 0
+            log.warning("SUSPICIOUS — auto-clicker running: %s",
+                        ", ".join(self._autoclicker_detected))
+        elif current == "ACTIVE":
             score = self._tracker.calculate_activity_score()
-            if cheat_flag:
-                hb_state = "SUSPICIOUS"
-                score = 0
-                log.warning("SUSPICIOUS — auto-clicker running: %s",
-                            ", ".join(self._autoclicker_detected))
-
-        state_changed = hb_state != self.state.last_heartbeat_state
-        interval_elapsed = (now - self.state.last_heartbeat_time) >= interval
-
-        if (state_changed or interval_elapsed) and not self.state.heartbeat_in_flight:
-            self.state.last_heartbeat_state = hb_state
-            self.state.last_heartbeat_time = now
-            self.state.heartbeat_in_flight = True
-
-            def do_heartbeat(s=hb_state, sc=score, cheat=cheat_flag):
-                success = False
+
+        state.last_heartbeat_state = hb_state
+        state.last_heartbeat_time = now
+        self._enqueue_heartbeat((hb_state, score, cheat_flag))
+
+    def _enqueue_heartbeat(self, item):
+        """Hand a heartbeat to the sender thread, dropping the oldest if full."""
+        while True:
+            try:
+                self._hb_queue.put_nowait(item)
+                return
+            except queue.Full:
                 try:
-                    success = send_heartbeat(self._config, s, sc, cheat)
-                except Exception as e:
-                    log.warning("Heartbeat thread error: %s", e)
-                finally:
-                    self.state.heartbeat_in_flight = False
-                    if success:
-                        self.state.consecutive_hb_failures = 0
-                    else:
-                        self.state.consecutive_hb_failures += 1
-
-            threading.Thread(target=do_heartbeat, daemon=True).start()
+                    self._hb_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _heartbeat_worker(self):
+        """Sender thread: sends queued heartbeats one at a time. None = stop."""
+        failures = 0    # consecutive failed sends — owned by this thread
+        while True:
+            item = self._hb_queue.get()
+            if item is None:
+                return
+            hb_state, score, cheat = item
+            success = False
+            try:
+                success = send_heartbeat(self._config, hb_state, score, cheat)
+            except Exception as e:
+                log.warning("Heartbeat worker error: %s", e)
+            if success:
+                failures = 0
+                self.state.hb_failing.clear()
+                # A live POST just succeeded, so the link is up: drain anything
+                # buffered by a transient failure that never tripped OFFLINE.
+                # On the break-log worker, so replayed break steps stay in
+                # order with the live ones.
+                if network.has_buffered_requests():
+                    try:
+                        self._submit_break(network.flush_buffer)
+                    except RuntimeError:
+                        pass    # break pool already shut down (agent stopping)
+            else:
+                failures += 1
+                if failures >= _HB_FAILURES_BEFORE_CHECK:
+                    failures = 0
+                    self.state.hb_failing.set()
 
     # ─── Connectivity monitoring (every 15s) ──────────────────
 
@@ -275,7 +412,6 @@ class AgentApp:
             self._do_connectivity_check()
         except Exception as e:
             log.error("_check_connectivity error: %s", e)
-        self._root.after(CONNECTIVITY_CHECK_SEC * 1000, self._check_connectivity)
 
     def _do_connectivity_check(self):
         server_url = self._config.get("serverUrl", "")
@@ -285,14 +421,14 @@ class AgentApp:
         was_online = self.state.online
 
         # Detect offline: after 2 consecutive heartbeat failures, verify with socket
-        if self.state.consecutive_hb_failures >= 2 and was_online:
+        if self.state.hb_failing.is_set() and was_online:
             online_now = network.is_online(server_url)
             if not online_now:
                 self.state.mark_offline()
                 log.warning("Network OFFLINE — starting offline break tracking")
                 self._start_offline_break()
             else:
-                self.state.consecutive_hb_failures = 0
+                self.state.hb_failing.clear()
 
         # When offline: check for recovery
         if not self.state.online:
@@ -301,45 +437,33 @@ class AgentApp:
                 self._on_reconnect()
 
     def _start_offline_break(self):
-        """Record internet disconnect as break start."""
+        """
+        Record internet disconnect as break start.
+
+        Nothing is sent yet — the server is unreachable anyway. The break is
+        created with its reason in one POST on reconnect (see _on_reconnect).
+        """
         if self.state.offline_break_started:
             return
         self.state.offline_break_started = True
-
-        start_time = self.state.offline_since
-        log.info("Auto-creating break for network disconnect at %.0f", start_time)
-        threading.Thread(
-            target=send_break_start,
-            args=(self._config, start_time),
-            daemon=True,
-        ).start()
+        log.info("Offline break pending from %.0f", self.state.offline_since)
 
     def _on_reconnect(self):
         """Handle internet reconnection: end offline break, flush buffer."""
         log.info("Network ONLINE — reconnected")
         had_offline_break = self.state.offline_break_started
+        offline_since = self.state.offline_since
 
         self.state.mark_online()
 
+        # Replay buffered calls first, on the break-log worker: an older
+        # buffered break step must reach the server before the new
+        # disconnect break, or it would close/duplicate that break.
         if had_offline_break:
-            log.info("Ending offline disconnect break + updating reason")
-
-            def end_offline_break():
-                send_break_reason(
-                    self._config,
-                    "General",
-                    "Internet disconnection (auto-detected)",
-                )
-                send_break_end(self._config)
-
-            threading.Thread(target=end_offline_break, daemon=True).start()
-
-        # Flush any buffered offline requests
-        if network.has_buffered_requests():
-            def flush():
-                time.sleep(2)  # Brief delay to let the connection stabilize
-                network.flush_buffer()
-            threading.Thread(target=flush, daemon=True).start()
+            log.info("Recording offline disconnect break")
+            self._submit_break(_flush_then_record_offline_break, self._config, offline_since)
+        elif network.has_buffered_requests():
+            self._submit_break(_flush_after_reconnect)
 
     # ─── Dynamic shift refresh (every 10 min) ───────────────────
 
@@ -348,10 +472,7 @@ class AgentApp:
         try:
             info = network.fetch_shift_info(self._config)
             if info:
-                self.state.shift_start = info.get("shiftStart")
-                self.state.shift_end = info.get("shiftEnd")
-                self.state.shift_grace_min = info.get("gracePeriod", 20)
-                self.state.shift_crosses_midnight = info.get("crossesMidnight", False)
+                self.state.apply_shift_info(info)
                 log.info(
                     "Shift config refreshed: %s→%s (grace=%s)",
                     self.state.shift_start or "?",
@@ -360,7 +481,6 @@ class AgentApp:
                 )
         except Exception as e:
             log.warning("Shift refresh failed (non-fatal): %s", e)
-        self._root.after(SHIFT_REFRESH_SEC * 1000, self._refresh_shift_info)
 
     # ─── Auto-clicker detection (every 60s) ─────────────────
 
@@ -379,7 +499,6 @@ class AgentApp:
             self._autoclicker_detected = found
         except Exception as e:
             log.error("_check_autoclicker error: %s", e)
-        self._root.after(AUTOCLICKER_CHECK_SEC * 1000, self._check_autoclicker)
 
     def _show_cheat_warning(self):
         """Show a professional warning popup when auto-clicker is detected."""
@@ -459,43 +578,59 @@ class AgentApp:
             network.save_alive_ts(self._config["empCode"])
         except Exception as e:
             log.error("_save_alive error: %s", e)
-        self._root.after(ALIVE_SAVE_SEC * 1000, self._save_alive)
 
     # ─── Popup lifecycle ─────────────────────────────────────
 
     def _show_popup(self):
         """Show the idle popup and open a break in DB. Main thread only."""
         self.state.on_popup_shown()
+        self._listeners.mute()
         self._popup.show()
 
         start_time = self.state.break_start_time
-        threading.Thread(
-            target=send_break_start,
-            args=(self._config, start_time),
-            daemon=True,
-        ).start()
+        self._break_start_future = self._submit_break(send_break_start, self._config, start_time)
 
         log.info("Idle popup shown, break_start sent (episode)")
 
     def _on_popup_submitted(self, reason, custom_reason):
         """Callback from IdlePopup after successful submit. Main thread."""
         self.state.on_popup_submitted()
+        self._listeners.unmute()
         log.info("Popup submitted: %s — %s", reason, custom_reason)
 
+    def _submit_popup_reason(self, reason, custom):
+        """
+        Queue the popup's reason; returns a Future the popup polls. Main thread.
+
+        If the 'Pending' break-start never left the queue (worker still busy
+        with an earlier call), it is cancelled and the break is opened with
+        the reason in one POST instead of POST + PATCH.
+        """
+        start = self._break_start_future
+        if start is not None and start.cancel():
+            log.info("Break start still queued — opening break with reason directly")
+            return self._submit_break(
+                _open_break_with_reason, self._config,
+                self.state.break_start_time, reason, custom,
+            )
+        return self._submit_break(
+            send_break_reason, self._config, reason, custom, self.state.break_start_time,
+        )
+
     def _send_break_end_async(self):
-        if self._break_end_in_flight:
+        # The Future is only read and replaced here on the main thread, so the
+        # worker never writes back into app state.
+        if self._break_end_future is not None and not self._break_end_future.done():
             return
-        self._break_end_in_flight = True
-
-        def do_call():
-            try:
-                send_break_end(self._config)
-            except Exception as e:
-                log.warning("Break end thread error: %s", e)
-            finally:
-                self._break_end_in_flight = False
+        self._break_end_future = self._submit_break(
+            send_break_end, self._config, self.state.break_start_time,
+        )
 
-        threading.Thread(target=do_call, daemon=True).start()
+    def _submit_break(self, fn, *args):
+        """Queue a break-log call; log (with traceback) anything it raises."""
+        future = self._break_pool.submit(fn, *args)
+        future.add_done_callback(_log_worker_error)
+        return future
 
     # ─── Listener watchdog (every 30s) ───────────────────────
 
@@ -504,114 +639,37 @@ class AgentApp:
             self._listeners.check_and_restart()
         except Exception as e:
             log.error("Listener watchdog error: %s", e)
-        self._root.after(30000, self._check_listeners)
 
 
-# ─── Downtime recovery (called once at startup, before mainloop) ──
+def _flush_after_reconnect():
+    time.sleep(2)  # Brief delay to let the connection stabilize
+    network.flush_buffer(wait=True)
 
-def recover_downtime(config, shift_info=None):
+
+def _flush_then_record_offline_break(config, offline_since):
     """
-    Check for a power-off/restart gap since last run.
-    If the gap is > DOWNTIME_MIN_GAP_SEC, create a completed break record
-    covering only the portion of downtime that falls inside the shift+grace
-    window.  Time outside the shift is silently ignored.
+    Flush (waiting out one already running), then record the disconnect
+    break. If older entries are still buffered — the breaker was open or
+    the link dropped again mid-flush — send_break_start queues the break
+    behind them rather than overtaking them, and the end follows it.
     """
-    emp_code = config["empCode"]
-    last_alive = network.get_last_alive_ts(emp_code)
-    if last_alive is None:
-        log.info("No previous alive timestamp — first run or reset")
-        network.save_alive_ts(emp_code)
-        return
-
-    gap = time.time() - last_alive
-    if gap < DOWNTIME_MIN_GAP_SEC:
-        log.info("Downtime gap %.0fs (< %ds threshold) — normal restart", gap, DOWNTIME_MIN_GAP_SEC)
-        network.save_alive_ts(emp_code)
-        return
-
-    log.warning(
-        "Detected %.0fs power-off gap (%.1f min) — creating recovery break",
-        gap, gap / 60,
-    )
-
-    # Clip recovery to shift+grace window if shift info is available.
-    # This prevents recording 17+ hour "breaks" that span past shift end.
-    effective_start = last_alive
-    if shift_info:
-        try:
-            grace_sec = shift_info.get("gracePeriod", 20) * 60
-            shift_end_str = shift_info.get("shiftEnd")      # "HH:MM"
-            shift_start_str = shift_info.get("shiftStart")   # "HH:MM"
-            crosses = shift_info.get("crossesMidnight", False)
-
-            if shift_end_str and shift_start_str:
-                alive_dt = datetime.fromtimestamp(last_alive, tz=_PKT)
-                alive_date = alive_dt.date()
-
-                sh, sm = map(int, shift_start_str.split(":"))
-                eh, em = map(int, shift_end_str.split(":"))
-
-                shift_start_dt = datetime(
-                    alive_date.year, alive_date.month, alive_date.day,
-                    sh, sm, tzinfo=_PKT,
-                )
-
-                if crosses:
-                    next_day = alive_date + timedelta(days=1)
-                    shift_end_dt = datetime(
-                        next_day.year, next_day.month, next_day.day,
-                        eh, em, tzinfo=_PKT,
-                    )
-                    # If last_alive is before midnight, shift_start is same day.
-                    # If after midnight, shift started the previous day.
-                    if alive_dt.hour < 12:
-                        prev_day = alive_date - timedelta(days=1)
-                        shift_start_dt = datetime(
-                            prev_day.year, prev_day.month, prev_day.day,
-                            sh, sm, tzinfo=_PKT,
-                        )
-                        shift_end_dt = datetime(
-                            alive_date.year, alive_date.month, alive_date.day,
-                            eh, em, tzinfo=_PKT,
-                        )
-                else:
-                    shift_end_dt = datetime(
-                        alive_date.year, alive_date.month, alive_date.day,
-                        eh, em, tzinfo=_PKT,
-                    )
-
-                grace_end_ts = shift_end_dt.timestamp() + grace_sec
-                shift_start_ts = shift_start_dt.timestamp()
-
-                # Skip entirely if last_alive was already past grace end
-                if last_alive >= grace_end_ts:
-                    log.info(
-                        "Power-off at %.0f was after shift grace end (%.0f) — no recovery break needed",
-                        last_alive, grace_end_ts,
-                    )
-                    network.save_alive_ts(emp_code)
-                    return
-
-                if effective_start < shift_start_ts:
-                    effective_start = shift_start_ts
-
-                clipped_gap = grace_end_ts - effective_start
-                log.info(
-                    "Recovery clipped to shift window: %.1f min (was %.1f min raw)",
-                    clipped_gap / 60, gap / 60,
-                )
-        except Exception as e:
-            log.warning("Shift-clip calculation failed (using raw gap): %s", e)
-
-    try:
-        ok = send_break_start(config, effective_start)
-        if ok:
-            send_break_reason(config, "General", "System Power Off / Restart (auto-detected)")
-            send_break_end(config)
-            log.info("Downtime recovery break recorded successfully")
-        else:
-            log.warning("Downtime recovery break-start failed — will retry via buffer")
-    except Exception as e:
-        log.error("Downtime recovery error: %s", e)
-
-    network.save_alive_ts(emp_code)
+    _flush_after_reconnect()
+    started = send_break_start(config, offline_since, "General",
+                               "Internet disconnection (auto-detected)")
+    if started == BREAK_SENT:
+        send_break_end(config, offline_since)
+    elif started == BREAK_BUFFERED:
+        send_break_end(config, offline_since, buffer_only=True)
+
+
+def _open_break_with_reason(config, start_time, reason, custom):
+    # Undelivered calls are buffered (refused ones logged) by send_break_start,
+    # so the popup may close either way — same contract as send_break_reason.
+    send_break_start(config, start_time, reason, custom)
+    return True
+
+
+def _log_worker_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        exc = future.exception()
+        log.error("Break-log worker error: %s", exc, exc_info=exc)
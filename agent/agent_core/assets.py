@@ -0,0 +1,98 @@
+"""
+Shared Tk image assets (GDS logo).
+"""
+
+import hashlib
+import os
+import tkinter as tk
+
+from .config import BASE_DIR, log, resource_path
+
+try:
+    from PIL import Image, ImageTk
+except ImportError:          # Pillow is optional — Tk can decode PNG itself
+    Image = ImageTk = None
+
+_LOGO_FILE = "gds.png"
+
+
+def _scaled_logo_file(path, target_px):
+    """
+    On-disk copy of the logo already scaled to target_px. Keyed by a hash
+    of the source's bytes: a rebuilt gds.png gets a new file even without
+    a version bump (mtimes are useless here — PyInstaller re-extracts the
+    file on every run).
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    return BASE_DIR / f"logo_{target_px}_{digest}.png"
+
+
+def _save_scaled_logo(logo_img, scaled, target_px):
+    """Write via a temp file + os.replace, then drop copies of older logos."""
+    tmp = scaled.with_name(scaled.name + ".tmp")
+    try:
+        if ImageTk is not None:
+            ImageTk.getimage(logo_img).save(tmp, "PNG")
+        else:
+            logo_img.write(str(tmp), format="png")
+        os.replace(tmp, scaled)
+        for old in BASE_DIR.glob(f"logo_{target_px}_*.png"):
+            if old != scaled:
+                old.unlink(missing_ok=True)
+    except Exception as e:
+        log.debug("Could not cache scaled logo: %s", e)
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def load_logo(master, target_px=80):
+    """
+    Load the GDS logo scaled to ~target_px. Returns a PhotoImage bound to
+    master's interpreter. Keep a reference (e.g. widget._logo) so Tk
+    doesn't garbage-collect it.
+
+    Decoded once per (Tk root, size) and cached on the root, so repeat
+    popups reuse the same image instead of re-reading the PNG. Images
+    can't cross interpreters, hence per-root rather than module-level.
+    """
+    root = master._root()
+    cache = root.__dict__.setdefault("_logo_cache", {})
+    logo_img = cache.get(target_px)
+    if logo_img is None:
+        logo_img = cache[target_px] = _load_scaled_logo(root, target_px)
+    return logo_img
+
+
+def _load_scaled_logo(master, target_px):
+    """
+    The bundled PNG is 1020px; decoding and scaling it costs tens of ms of
+    main-thread time per process. The scaled result is written next to the
+    config on first use, so later runs (and the one-shot enroll dialog)
+    load a small PNG instead.
+    """
+    path = resource_path(_LOGO_FILE)
+    scaled = _scaled_logo_file(path, target_px)
+    try:
+        return tk.PhotoImage(master=master, file=str(scaled))
+    except tk.TclError:
+        pass
+    logo_img = _decode_logo(master, path, target_px)
+    _save_scaled_logo(logo_img, scaled, target_px)
+    return logo_img
+
+
+def _decode_logo(master, path, target_px):
+    """
+    With Pillow: C decoder + LANCZOS thumbnail (sharp, exact size).
+    Without: Tk decode + integer subsample (nearest-neighbour).
+    """
+    if Image is not None:
+        with Image.open(path) as img:
+            img.thumbnail((target_px, target_px), Image.LANCZOS)
+            return ImageTk.PhotoImage(img, master=master)
+    logo_img = tk.PhotoImage(master=master, file=path)
+    scale = max(1, logo_img.width() // target_px)
+    return logo_img.subsample(scale, scale)
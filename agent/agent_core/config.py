@@ -5,7 +5,10 @@ Paths, logging setup, config load/save, safe_print, resource_path.
 import os
 import json
 import sys
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 
@@ -47,25 +50,34 @@ def safe_print(*args, **kwargs):
 
 # ─── Logging ─────────────────────────────────────────────────────
 
-try:
-    if LOG_FILE.exists() and LOG_FILE.stat().st_size > 1_000_000:
-        LOG_FILE.write_text("")
-except Exception:
-    pass
-
-logging.basicConfig(
-    filename=str(LOG_FILE),
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    encoding="utf-8",
+# Callers (Tk main thread, API workers, listeners) only enqueue records;
+# a single QueueListener thread does the formatting and disk/console I/O.
+# RotatingFileHandler replaces the old "truncate at 1 MB on startup" hack.
+
+file_handler = RotatingFileHandler(
+    str(LOG_FILE), maxBytes=1_000_000, backupCount=1, encoding="utf-8",
 )
-log = logging.getLogger("svc")
+file_handler.setFormatter(logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S",
+))
 
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.INFO)
 console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-log.addHandler(console_handler)
+console_handler.addFilter(logging.Filter("svc"))   # console shows agent logs only
+
+_log_queue = queue.SimpleQueue()   # unbounded, no task-tracking lock overhead
+_log_listener = QueueListener(
+    _log_queue, file_handler, console_handler, respect_handler_level=True,
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+
+log = logging.getLogger("svc")
 
 
 # ─── Config Management ──────────────────────────────────────────
@@ -74,15 +86,14 @@ def load_config():
     """Load config from disk. Returns dict or None."""
     if CONFIG_FILE.exists():
         try:
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            # One read + one C-level parse (json.loads sniffs the encoding of bytes)
+            return json.loads(CONFIG_FILE.read_bytes())
+        except (ValueError, IOError):
             return None
     return None
 
 
 def save_config(config):
     """Save config dict to disk."""
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    CONFIG_FILE.write_text(json.dumps(config, indent=2), encoding="utf-8")
     log.info("Config saved to %s", CONFIG_FILE)
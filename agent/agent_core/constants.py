@@ -2,8 +2,14 @@
 Constants, thresholds, theme colors, and break reason categories.
 """
 
+from datetime import timedelta, timezone
+from types import MappingProxyType
+
 AGENT_VERSION = "2.1.1"
 
+# Shift times from the server are Pakistan Standard Time (UTC+5, no DST)
+PKT = timezone(timedelta(hours=5))
+
 # ─── Thresholds ──────────────────────────────────────────────────
 IDLE_THRESHOLD_SEC = 180       # No activity for 180s (3 min) → IDLE
 HEARTBEAT_INTERVAL_SEC = 180   # Send heartbeat every 3 minutes
@@ -11,7 +17,9 @@ MOVE_THROTTLE_SEC = 0.5        # Only record mouse move every 500ms (saves CPU)
 PATTERN_BUFFER_SIZE = 30       # Keep last 30 events for analysis (low RAM)
 
 # ─── Network ─────────────────────────────────────────────────────
-API_TIMEOUT_HEARTBEAT = 25     # Seconds — generous for Vercel cold starts
+API_TIMEOUT_CONNECT = 4       # TCP/TLS connect — fail fast when the host is unreachable
+API_TIMEOUT_HEARTBEAT = 12     # Ceiling of the adaptive heartbeat read timeout
+API_TIMEOUT_HEARTBEAT_MIN = 4  # Floor of the adaptive heartbeat read timeout
 API_TIMEOUT_BREAK = 30         # Break APIs need more time (cold start + DB write)
 CONNECTIVITY_CHECK_SEC = 15    # How often to check connectivity when offline
 ALIVE_SAVE_SEC = 30            # How often to persist "last alive" timestamp
@@ -54,14 +62,15 @@ AUTOCLICKER_PROCESSES = frozenset({
 })
 
 # ─── Break Categories ────────────────────────────────────────────
-BREAK_REASONS = [
+BREAK_REASONS = (
     "Official",
     "General",
     "Namaz",
-]
+)
 
 # ─── Portal Theme Colors (matching HR portal dark theme) ─────────
-THEME = {
+# Read-only view: shared by every window, so nothing may mutate it.
+THEME = MappingProxyType({
     "bg_darkest":    "#020617",   # fullscreen overlay
     "bg_dark":       "#0f172a",   # secondary bg
     "bg_card":       "#1e293b",   # card background
@@ -78,4 +87,4 @@ THEME = {
     "success":       "#22c55e",   # green
     "error":         "#ef4444",   # red
     "warning":       "#fbbf24",   # yellow
-}
+})
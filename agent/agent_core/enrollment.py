@@ -3,28 +3,51 @@ Device enrollment: server registration + GUI enrollment dialog.
 """
 
 import platform
+import threading
+import time
 import tkinter as tk
+from concurrent.futures import Future
 import requests
 
 from .constants import AGENT_VERSION, THEME
-from .config import log, save_config, resource_path
-from .http_client import http
+from .config import log, save_config
+from .assets import load_logo
+from . import http_client
+
+# Host identity is fixed for the life of the process — resolve it once.
+_DEVICE_NAME = platform.node()
+_OS_NAME = f"{platform.system()} {platform.release()}"
 
 
 # ─── Server Enrollment ───────────────────────────────────────────
 
 def enroll(server_url, emp_code):
-    """Enroll this device with the HR server. Returns config dict."""
+    """
+    Enroll this device with the HR server. Returns the config dict; the
+    caller saves it (gui_enroll only does so if the dialog is still open).
+    """
     url = f"{server_url.rstrip('/')}/api/agent/enroll"
     payload = {
         "empCode": emp_code,
-        "deviceName": platform.node(),
-        "os": f"{platform.system()} {platform.release()}",
+        "deviceName": _DEVICE_NAME,
+        "os": _OS_NAME,
         "agentVersion": AGENT_VERSION,
     }
 
     log.info("Enrolling device for %s at %s ...", emp_code, url)
-    resp = http.post(url, json=payload, timeout=15)
+    body = http_client.encode_json(payload)
+    resp = None
+    for attempt in range(3):
+        if attempt:
+            time.sleep(http_client.backoff_delay(attempt - 1))  # ride out a cold start
+        try:
+            resp = http_client.http.post(url, data=body, timeout=15)
+        except requests.ConnectionError:
+            if attempt == 2:
+                raise
+            continue
+        if resp.status_code not in http_client.RETRY_STATUSES:
+            break
     resp.raise_for_status()
     data = resp.json()
 
@@ -39,11 +62,28 @@ def enroll(server_url, emp_code):
         "heartbeatIntervalSec": data.get("heartbeatIntervalSec", 180),
     }
 
-    save_config(config)
     log.info("Enrolled successfully! Device ID: %s", config["deviceId"])
     return config
 
 
+def _enroll_in_background(server_url, emp_code):
+    """
+    Run enroll() on a daemon thread and return a Future for its result.
+    Daemon, so closing the dialog mid-connect doesn't keep the process
+    alive waiting on a request whose result nobody will use.
+    """
+    future = Future()
+
+    def work():
+        try:
+            future.set_result(enroll(server_url, emp_code))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=work, name="enroll", daemon=True).start()
+    return future
+
+
 # ─── GUI Enrollment Dialog ───────────────────────────────────────
 
 def gui_enroll():
@@ -72,10 +112,7 @@ def gui_enroll():
     header_content.pack(expand=True)
 
     try:
-        logo_path = resource_path("gds.png")
-        logo_img = tk.PhotoImage(file=logo_path)
-        scale = max(1, logo_img.width() // 80)
-        logo_img = logo_img.subsample(scale, scale)
+        logo_img = load_logo(root, 80)
         root._logo = logo_img
         tk.Label(header_content, image=logo_img,
                  bg=THEME["header_bg"]).pack(side="left", padx=(0, 18))
@@ -103,28 +140,30 @@ def gui_enroll():
              font=("Segoe UI", 12, "bold"),
              bg=THEME["bg_darkest"], fg=THEME["text_primary"]).pack(anchor="w")
     emp_var = tk.StringVar()
-    emp_frame = tk.Frame(body, bg=THEME["border"], padx=1, pady=1)
-    emp_frame.pack(fill="x", pady=(6, 18))
-    emp_entry = tk.Entry(emp_frame, textvariable=emp_var,
+    emp_entry = tk.Entry(body, textvariable=emp_var,
                          font=("Segoe UI", 13),
                          bg=THEME["bg_input"], fg=THEME["text_primary"],
                          insertbackground=THEME["text_primary"],
-                         relief="flat", borderwidth=0)
-    emp_entry.pack(fill="x", ipady=8, padx=8, pady=4)
+                         relief="flat", borderwidth=0,
+                         highlightthickness=1,
+                         highlightbackground=THEME["border"],
+                         highlightcolor=THEME["primary"])
+    emp_entry.pack(fill="x", ipady=12, pady=(6, 18))
 
     # Server URL
     tk.Label(body, text="Server URL",
              font=("Segoe UI", 12, "bold"),
              bg=THEME["bg_darkest"], fg=THEME["text_primary"]).pack(anchor="w")
     url_var = tk.StringVar(value="https://hr-portal-beryl.vercel.app")
-    url_frame = tk.Frame(body, bg=THEME["border"], padx=1, pady=1)
-    url_frame.pack(fill="x", pady=(6, 18))
-    url_entry = tk.Entry(url_frame, textvariable=url_var,
+    url_entry = tk.Entry(body, textvariable=url_var,
                          font=("Segoe UI", 13),
                          bg=THEME["bg_input"], fg=THEME["text_primary"],
                          insertbackground=THEME["text_primary"],
-                         relief="flat", borderwidth=0)
-    url_entry.pack(fill="x", ipady=8, padx=8, pady=4)
+                         relief="flat", borderwidth=0,
+                         highlightthickness=1,
+                         highlightbackground=THEME["border"],
+                         highlightcolor=THEME["primary"])
+    url_entry.pack(fill="x", ipady=12, pady=(6, 18))
 
     status = tk.Label(body, text="", font=("Segoe UI", 11),
                       bg=THEME["bg_darkest"])
@@ -142,21 +181,34 @@ def gui_enroll():
 
         status.config(text="Connecting...", fg=THEME["primary"])
         btn.config(state="disabled")
-        root.update()
-
-        try:
-            config = enroll(url, emp)
-            result["config"] = config
-            status.config(text="Enrolled! Starting agent...", fg=THEME["success"])
-            root.after(800, root.quit)
-        except requests.ConnectionError:
-            status.config(text=f"Cannot connect to {url}. Check network.",
-                          fg=THEME["error"])
-            btn.config(state="normal")
-        except Exception as e:
-            err_msg = str(e)[:80]
-            status.config(text=f"Error: {err_msg}", fg=THEME["error"])
-            btn.config(state="normal")
+        root.update_idletasks()
+
+        # enroll() blocks for up to a few retries; run it off the Tk thread
+        # so the dialog keeps redrawing and can still be closed meanwhile.
+        future = _enroll_in_background(url, emp)
+
+        def poll():
+            # Widgets and the config file are only touched here, on the Tk
+            # thread, so nothing is saved once the dialog has been closed.
+            if not future.done():
+                root.after(100, poll)
+                return
+            try:
+                config = future.result()
+                save_config(config)
+                result["config"] = config
+                status.config(text="Enrolled! Starting agent...", fg=THEME["success"])
+                root.after(800, root.quit)
+            except requests.ConnectionError:
+                status.config(text=f"Cannot connect to {url}. Check network.",
+                              fg=THEME["error"])
+                btn.config(state="normal")
+            except Exception as e:
+                err_msg = str(e)[:80]
+                status.config(text=f"Error: {err_msg}", fg=THEME["error"])
+                btn.config(state="normal")
+
+        root.after(100, poll)
 
     btn = tk.Button(body, text="Connect & Start",
                     font=("Segoe UI", 14, "bold"),
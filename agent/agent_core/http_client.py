@@ -1,26 +1,83 @@
 """
-HTTP session with connection pooling, automatic retry, and SSL fix.
+HTTP session with connection pooling and SSL fix.
+
+One Session is shared for the whole process lifetime, across
+run_with_auto_restart() cycles, so its warm keep-alive TLS connections
+survive crashes elsewhere in the agent. urllib3 already discards any
+individual connection that errors; the Session itself is only rebuilt
+when it is actually unusable (see refresh_session_if_stale).
+
+Request-level retries live in the callers (api.py, enrollment.py), where
+they can see status codes, jitter their backoff and feed the circuit
+breaker. The adapter only retries connection setup, once and at once:
+nothing has been sent yet, so it is safe for POST/PATCH, and a one-off
+connect failure (DNS blip, refused handshake during an edge swap) no
+longer costs a caller backoff and a circuit-breaker strike.
 
 The SSL CA bundle fix in agent.py (entry point) sets REQUESTS_CA_BUNDLE
 before this module is imported, ensuring PyInstaller builds find certs.
 This module also explicitly sets verify=True with certifi as fallback.
 """
 
+import json
 import os
+import random
+import socket
+import threading
+import time
+
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 from urllib3.util.retry import Retry
 
-_retry_strategy = Retry(
-    total=3,
-    backoff_factor=2,                           # Wait 2s, 4s, 8s between retries
-    status_forcelist=[502, 503, 504],
-    allowed_methods=["HEAD", "GET", "POST", "PATCH"],
-)
+from .constants import AGENT_VERSION
+
+# Gateway errors worth retrying (Vercel cold start / deploy swap)
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+def is_permanent_rejection(status):
+    """
+    4xx other than 429: the server understood the call and refused it
+    (revoked device, no open break, validation). Resending it never helps.
+    """
+    return 400 <= status < 500 and status != 429
+
+
+BACKOFF_BASE = 2.0    # Ceiling of the first retry (~ a Vercel cold start)
+BACKOFF_CAP = 16.0
+
+
+def backoff_delay(attempt):
+    """
+    Seconds to sleep after failed attempt number `attempt` (0-based).
+    "Full jitter": uniform over [0, capped exponential], so agents that
+    lose the server at the same moment spread their retries across the
+    whole window instead of clustering around the same instant.
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+_ca_bundle = None
 
 
 def _get_ca_bundle():
-    """Get the CA bundle path.
+    """Get the CA bundle path (cached; re-resolved only if the file is gone).
+
+    A session is only rebuilt after a crash or because its bundle vanished
+    (refresh_session_if_stale), so the cached path costs one isfile() check
+    instead of the full probe.
+    """
+    global _ca_bundle
+    if _ca_bundle is True or (_ca_bundle and os.path.isfile(_ca_bundle)):
+        return _ca_bundle
+    _ca_bundle = _find_ca_bundle()
+    return _ca_bundle
+
+
+def _find_ca_bundle():
+    """Probe for the CA bundle path.
 
     Priority: permanent ProgramData copy → env var → certifi → system default.
     The permanent copy survives PyInstaller _MEI temp dir cleanup.
@@ -41,20 +98,72 @@ def _get_ca_bundle():
         return True
 
 
+# Connection-setup errors only; reads, statuses and redirects are never
+# retried here (see module docstring).
+_CONNECT_RETRY = Retry(
+    total=1, connect=1, read=0, status=0, other=0, redirect=0,
+    backoff_factor=0, raise_on_status=False,
+)
+
+
+def _socket_options():
+    """
+    urllib3's defaults (TCP_NODELAY already on) plus TCP keep-alive probes.
+    Heartbeats are minutes apart; probing an idle pooled connection after
+    30s keeps NAT/proxy mappings open and exposes a silently dropped one
+    before the next request tries to reuse it.
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):       # per-socket tuning: Win10 1709+, Linux
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+_SOCKET_OPTIONS = _socket_options()
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections use _SOCKET_OPTIONS."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
 def create_session():
-    """Create a new requests.Session with connection pooling, retry, and SSL."""
+    """Create a new requests.Session with connection pooling and SSL."""
     session = requests.Session()
-    adapter = HTTPAdapter(
+    # One host; up to 4 concurrent callers (heartbeat sender, break-log
+    # worker, buffer flush, shift refresh) each keep a warm connection.
+    # pool_block makes any extra caller wait for one of them rather than
+    # opening (and then discarding) a fresh TLS connection.
+    adapter = _KeepAliveAdapter(
         pool_connections=1,
-        pool_maxsize=3,
-        max_retries=_retry_strategy,
+        pool_maxsize=4,
+        pool_block=True,
+        max_retries=_CONNECT_RETRY,
     )
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.verify = _get_ca_bundle()
+    # Bodies are sent pre-encoded via data=encode_json(...), so the JSON
+    # content type is set once here rather than by requests per call.
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Connection": "keep-alive",
+        "User-Agent": f"WinSystemHealth/{AGENT_VERSION}",
+    })
     return session
 
 
+def encode_json(payload):
+    """Compact UTF-8 JSON body (no spaces after ',' and ':')."""
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
 def reset_session(session):
     """Close and recreate the HTTP session (fixes stale connections)."""
     try:
@@ -64,5 +173,107 @@ def reset_session(session):
     return create_session()
 
 
-# Global shared session
+class CircuitBreaker:
+    """
+    Fail fast while the server is down instead of tying up worker threads
+    in timeouts and retries.
+
+    CLOSED → OPEN after `fail_threshold` consecutive failures; OPEN → HALF_OPEN
+    once `reset_after` seconds have passed, letting a single probe through;
+    the probe's outcome closes or re-opens it. Thread-safe.
+
+    Failures are transport errors, 429 and 5xx — a 4xx means the server is
+    up and answering, so it counts as a success here.
+    """
+
+    def __init__(self, fail_threshold=5, reset_after=30.0):
+        self._fail_threshold = fail_threshold
+        self._reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None      # time.monotonic() when tripped, None = closed
+        self._probe_in_flight = False
+
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self):
+        """True if a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probe_in_flight:
+                return False
+            if time.monotonic() - self._opened_at < self._reset_after:
+                return False
+            self._probe_in_flight = True     # half-open: one probe
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self._fail_threshold:
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_response(self, resp):
+        """Classify an HTTP response and record it."""
+        if resp.status_code == 429 or resp.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+class LatencyEstimate:
+    """
+    Smoothed upper estimate of server response time, used to size read
+    timeouts from what the server actually does rather than a fixed worst case.
+
+    Rises quickly on a slow response and decays slowly on fast ones, so it
+    tracks the slow tail (~p95) rather than the mean. A timed-out request
+    should be observed with the timeout it hit, which extends the next one
+    during a sustained slowdown. Thread-safe.
+    """
+
+    _RISE = 0.25
+    _DECAY = 0.05
+
+    def __init__(self, initial):
+        self._lock = threading.Lock()
+        self._value = initial
+
+    def observe(self, seconds):
+        with self._lock:
+            alpha = self._RISE if seconds > self._value else self._DECAY
+            self._value += alpha * (seconds - self._value)
+
+    def timeout(self, floor, ceiling, factor=2.5):
+        """factor × estimate, clamped to [floor, ceiling]."""
+        with self._lock:
+            return min(ceiling, max(floor, factor * self._value))
+
+
+def refresh_session_if_stale():
+    """
+    Rebuild the global session only if its CA bundle file has vanished
+    (e.g. a cleaned-up PyInstaller temp dir). Returns True if rebuilt.
+    """
+    global http
+    verify = http.verify
+    if isinstance(verify, str) and not os.path.isfile(verify):
+        http = reset_session(http)
+        return True
+    return False
+
+
+# Global shared session and the breaker guarding it
 http = create_session()
+breaker = CircuitBreaker()
+heartbeat_latency = LatencyEstimate(initial=1.5)
@@ -1,13 +1,16 @@
 """
-Input listeners — pynput mouse/keyboard → queue.Queue().
-
-These are the ONLY background threads in the agent.
-They NEVER touch Tkinter. They put lightweight event tuples into a
-thread-safe queue that the main thread drains via root.after().
+Input listeners — pynput mouse/keyboard → collections.deque + counters.
+
+They NEVER touch Tkinter. Moves and clicks (which the tracker needs
+positions/timestamps for) are appended as small tuples to a bounded deque
+that the main thread drains via root.after(). Key presses and scrolls are
+only ever counted, so they just bump a counter instead. deque append/popleft
+are atomic under the GIL, and each counter has a single writer thread, so
+neither hand-off needs a Python-level lock per event.
 """
 
 import time
-import queue
+from collections import deque
 
 from pynput import mouse, keyboard
 
@@ -15,47 +18,88 @@ from .config import log
 from .constants import MOVE_THROTTLE_SEC
 
 
+def _discard(*args):
+    pass
+
+
 class InputListeners:
-    """Manages pynput listeners that feed events into a shared queue."""
+    """Manages pynput listeners that feed a shared deque and two counters."""
 
-    def __init__(self, input_queue: queue.Queue):
+    def __init__(self, input_queue: deque):
         self._queue = input_queue
+        # Running totals. Key presses are written only by the keyboard thread,
+        # scrolls only by the mouse thread; the main thread just reads them.
+        self._key_total = 0
+        self._scroll_total = 0
+        self._key_seen = 0
+        self._scroll_seen = 0
+        # Callbacks emit through sink[0..2] (event, key, scroll). While the
+        # popup is up they are swapped for _discard, so the hot path has no
+        # per-event "popup visible?" check.
+        self._live_sink = (input_queue.append, self._count_key, self._count_scroll)
+        self._sink = list(self._live_sink)
         self._mouse = None
         self._keyboard = None
 
+    def _count_key(self):
+        self._key_total += 1
+
+    def _count_scroll(self):
+        self._scroll_total += 1
+
+    def take_counts(self):
+        """(key presses, scrolls) since the last call. Main thread only."""
+        keys, scrolls = self._key_total, self._scroll_total
+        counts = (keys - self._key_seen, scrolls - self._scroll_seen)
+        self._key_seen, self._scroll_seen = keys, scrolls
+        return counts
+
+    def mute(self):
+        """Drop all input until unmute(). Called from main thread."""
+        self._sink[:] = (_discard, _discard, _discard)
+
+    def unmute(self):
+        """Resume feeding events. Called from main thread."""
+        self._sink[:] = self._live_sink
+
     def start(self):
         """Create and start mouse + keyboard listeners."""
-        q = self._queue
+        sink = self._sink
 
-        # Use closure-local mutable to avoid self-attribute access from pynput thread
-        last_move = [0.0]
+        # Use closure-local mutable to avoid self-attribute access from pynput thread.
+        # Deadline throttle on the monotonic clock: throttled moves cost one
+        # clock read + one compare and never touch the deque.
+        next_move_deadline = [0.0]
+        # Both mouse events stamp with the monotonic clock: the tracker only
+        # uses deltas, which a wall-clock step (NTP sync) would corrupt.
+        monotonic = time.monotonic
 
         def on_move(x, y):
             try:
-                now = time.time()
-                if now - last_move[0] < MOVE_THROTTLE_SEC:
+                now = monotonic()
+                if now < next_move_deadline[0]:
                     return
-                last_move[0] = now
-                q.put(("move", x, y, now))
+                next_move_deadline[0] = now + MOVE_THROTTLE_SEC
+                sink[0](("move", x, y, now))
             except Exception:
                 pass
 
         def on_click(x, y, button, pressed):
             try:
                 if pressed:
-                    q.put(("click", x, y, time.time()))
+                    sink[0](("click", x, y, monotonic()))
             except Exception:
                 pass
 
         def on_scroll(x, y, dx, dy):
             try:
-                q.put(("scroll", time.time()))
+                sink[2]()
             except Exception:
                 pass
 
         def on_press(key):
             try:
-                q.put(("key", time.time()))
+                sink[1]()
             except Exception:
                 pass
 
@@ -67,17 +111,21 @@ class InputListeners:
         self._mouse.start()
         self._keyboard.start()
 
-        log.info("Input listeners started (queue-based, no direct Tk access)")
+        log.info("Input listeners started (deque + counters, no direct Tk access)")
 
     def check_and_restart(self):
         """Restart dead listeners. Called from main thread via root.after()."""
         try:
             if self._mouse and not self._mouse.is_alive():
                 log.warning("Mouse listener died — restarting")
-                self.start()
             elif self._keyboard and not self._keyboard.is_alive():
                 log.warning("Keyboard listener died — restarting")
-                self.start()
+            else:
+                return
+            # Stop the survivor too: start() replaces both, and a leftover
+            # thread would double-feed events and break the one-writer counters.
+            self.stop()
+            self.start()
         except Exception as e:
             log.error("Listener restart error: %s", e)
 
@@ -13,6 +13,9 @@ Alive tracking: persists "last alive" timestamp for power-off recovery.
 import json
 import time
 import socket
+import threading
+
+import requests
 
 from .config import log, OFFLINE_BUFFER_FILE, LAST_ALIVE_FILE
 from . import http_client
@@ -38,26 +41,33 @@ def is_online(server_url):
 
 # ─── Offline buffer (local persistence) ──────────────────────────
 
-def buffer_request(method, url, payload):
-    """Save a failed API call to disk for later replay."""
+# The flush moves the buffer aside before replaying it, so appends made while
+# it runs land in a fresh file. A replay file left by a crash mid-flush is
+# picked up (oldest first) by the next flush.
+_REPLAY_FILE = OFFLINE_BUFFER_FILE.with_suffix(".replay")
+
+# Serialises appends against the flush's read/rewrite of the buffer file.
+_buffer_lock = threading.Lock()
+# (method, url, payload) of the last appended entry, for back-to-back dedupe
+# without re-reading the whole file on every append.
+_last_buffered = None
+
+
+def buffer_request(method, url, payload, headers=None):
+    """Append a failed API call to the buffer file for later replay."""
+    global _last_buffered
+    key = (method, url, payload)
     entry = {"method": method, "url": url, "payload": payload, "ts": time.time()}
+    if headers:
+        entry["headers"] = headers
     try:
-        # Avoid back-to-back duplicate entries for the same request payload.
-        if OFFLINE_BUFFER_FILE.exists():
-            try:
-                lines = OFFLINE_BUFFER_FILE.read_text(encoding="utf-8").strip().split("\n")
-                if lines and lines[-1].strip():
-                    last = json.loads(lines[-1])
-                    if (
-                        last.get("method") == method
-                        and last.get("url") == url
-                        and last.get("payload") == payload
-                    ):
-                        return
-            except Exception:
-                pass
-        with open(OFFLINE_BUFFER_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        with _buffer_lock:
+            # Avoid back-to-back duplicate entries for the same request payload.
+            if key == _last_buffered:
+                return
+            with open(OFFLINE_BUFFER_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            _last_buffered = key
         log.info("Buffered offline request: %s %s", method, url.split("/")[-1])
     except Exception as e:
         log.warning("Failed to buffer request: %s", e)
@@ -66,62 +76,129 @@ def buffer_request(method, url, payload):
 def has_buffered_requests():
     """Check if there are pending offline requests."""
     try:
-        return OFFLINE_BUFFER_FILE.exists() and OFFLINE_BUFFER_FILE.stat().st_size > 0
+        if OFFLINE_BUFFER_FILE.exists() and OFFLINE_BUFFER_FILE.stat().st_size > 0:
+            return True
+        return _REPLAY_FILE.exists()
     except Exception:
         return False
 
 
-def flush_buffer():
+_flush_lock = threading.Lock()
+
+
+def flush_buffer(wait=False):
     """
     Replay all buffered requests in order. Returns (flushed, remaining).
-    Requests that still fail are kept in the buffer for the next attempt.
+    Requests that still fail are kept in the buffer for the next attempt;
+    ones the server refuses outright (4xx other than 429) are dropped.
+
+    Safe to call from several worker threads: a flush already in progress
+    makes the others return immediately instead of replaying twice, unless
+    wait=True, which waits for it and then flushes whatever is left.
     """
     if not has_buffered_requests():
         return 0, 0
+    if http_client.breaker.is_open():
+        return 0, 0
+    if not _flush_lock.acquire(blocking=wait):
+        return 0, 0
+    try:
+        return _flush_buffer_locked()
+    finally:
+        _flush_lock.release()
+
 
+def _take_buffered_lines():
+    """Move the buffer aside for replay and return its lines (None if unreadable)."""
+    global _last_buffered
+    with _buffer_lock:
+        try:
+            if _REPLAY_FILE.exists():
+                with open(_REPLAY_FILE, "a", encoding="utf-8") as f:
+                    f.write(OFFLINE_BUFFER_FILE.read_text(encoding="utf-8"))
+                OFFLINE_BUFFER_FILE.unlink()
+            else:
+                OFFLINE_BUFFER_FILE.replace(_REPLAY_FILE)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            return None
+        _last_buffered = None
     try:
-        lines = OFFLINE_BUFFER_FILE.read_text(encoding="utf-8").strip().split("\n")
+        return _REPLAY_FILE.read_text(encoding="utf-8").strip().split("\n")
     except Exception:
+        return None
+
+
+def _finish_replay(unsent):
+    """Put unsent lines back ahead of anything buffered while the flush ran."""
+    with _buffer_lock:
+        if unsent:
+            try:
+                newer = OFFLINE_BUFFER_FILE.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                newer = ""
+            OFFLINE_BUFFER_FILE.write_text("\n".join(unsent) + "\n" + newer, encoding="utf-8")
+        _REPLAY_FILE.unlink(missing_ok=True)
+
+
+def _flush_buffer_locked():
+    lines = _take_buffered_lines()
+    if lines is None:
         return 0, 0
 
     lines = [l for l in lines if l.strip()]
     if not lines:
+        _finish_replay([])
         return 0, 0
 
     flushed = 0
+    dropped = 0
     still_failed = []
 
-    for line in lines:
+    for i, line in enumerate(lines):
         try:
             entry = json.loads(line)
             method = entry["method"].upper()
             url = entry["url"]
             payload = entry["payload"]
+            headers = entry.get("headers")
 
+            body = http_client.encode_json(payload)
             if method == "POST":
-                resp = http_client.http.post(url, json=payload, timeout=30)
+                resp = http_client.http.post(url, data=body, headers=headers, timeout=30)
             elif method == "PATCH":
-                resp = http_client.http.patch(url, json=payload, timeout=30)
+                resp = http_client.http.patch(url, data=body, headers=headers, timeout=30)
             else:
                 continue
 
-            if resp.status_code in (200, 201):
+            status = resp.status_code
+            if status in (200, 201):
                 flushed += 1
+            elif http_client.is_permanent_rejection(status):
+                # Replaying it again can only be refused again — or apply to
+                # whichever break happens to be open by then.
+                dropped += 1
+                log.warning("Dropped buffered %s %s: HTTP %d",
+                            method, url.split("/")[-1], status)
             else:
                 still_failed.append(line)
+        except (requests.ConnectionError, requests.Timeout):
+            # Link dropped again — keep this and everything after it for
+            # the next flush rather than paying a timeout per entry.
+            still_failed.extend(lines[i:])
+            break
         except Exception:
             still_failed.append(line)
 
     try:
-        if still_failed:
-            OFFLINE_BUFFER_FILE.write_text("\n".join(still_failed) + "\n", encoding="utf-8")
-        else:
-            OFFLINE_BUFFER_FILE.unlink(missing_ok=True)
-    except Exception:
-        pass
+        _finish_replay(still_failed)
+    except Exception as e:
+        log.warning("Failed to re-buffer %d requests: %s", len(still_failed), e)
 
-    if flushed:
-        log.info("Flushed %d buffered requests (%d still pending)", flushed, len(still_failed))
+    if flushed or dropped:
+        log.info("Flushed %d buffered requests (%d dropped, %d still pending)",
+                 flushed, dropped, len(still_failed))
     return flushed, len(still_failed)
 
 
@@ -2,7 +2,7 @@
 Windows-specific functionality:
   - Auto-start on boot (Task Scheduler)
   - Single instance enforcement (Mutex)
-  - System lock detection (LogonUI.exe process check)
+  - System lock detection (WTS session notifications, LogonUI.exe fallback)
   - Auto-clicker / cheat process detection
   - System-level idle time (GetLastInputInfo)
 """
@@ -11,6 +11,8 @@ import os
 import sys
 import ctypes
 import subprocess
+import threading
+from functools import lru_cache
 from pathlib import Path
 
 from .config import log
@@ -20,6 +22,108 @@ _EXE_NAME = "whealthsvc.exe"
 _TASK_NAME = "Windows System Health Monitor"
 _MUTEX_NAME = "Global\\WinSysHealth_7f3a"
 
+# ─── Win32 entry points (resolved once, typed for 64-bit handles) ─
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    _user32 = ctypes.windll.user32
+    _kernel32 = ctypes.windll.kernel32
+
+    _OpenInputDesktop = _user32.OpenInputDesktop
+    _OpenInputDesktop.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _OpenInputDesktop.restype = wintypes.HANDLE       # HDESK; None on failure
+    _CloseDesktop = _user32.CloseDesktop
+    _CloseDesktop.argtypes = [wintypes.HANDLE]
+    _CloseDesktop.restype = wintypes.BOOL
+    _GetLastInputInfo = _user32.GetLastInputInfo
+    _GetTickCount = _kernel32.GetTickCount
+    _GetTickCount.restype = wintypes.DWORD
+    _CreateMutexW = _kernel32.CreateMutexW
+    _CreateMutexW.argtypes = [wintypes.LPVOID, wintypes.BOOL, wintypes.LPCWSTR]
+    _CreateMutexW.restype = wintypes.HANDLE
+    _GetLastError = _kernel32.GetLastError
+    _CloseHandle = _kernel32.CloseHandle
+    _CloseHandle.argtypes = [wintypes.HANDLE]
+    _CloseHandle.restype = wintypes.BOOL
+    _EnumProcesses = _kernel32.K32EnumProcesses
+    _EnumProcesses.argtypes = [
+        ctypes.POINTER(wintypes.DWORD), wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+    ]
+    _EnumProcesses.restype = wintypes.BOOL
+    _GetModuleHandleW = _kernel32.GetModuleHandleW
+    _GetModuleHandleW.argtypes = [wintypes.LPCWSTR]
+    _GetModuleHandleW.restype = wintypes.HMODULE      # 64-bit; default c_int truncates
+    _CreateEventW = _kernel32.CreateEventW
+    _CreateEventW.argtypes = [wintypes.LPVOID, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+    _CreateEventW.restype = wintypes.HANDLE
+    _SetEvent = _kernel32.SetEvent
+    _SetEvent.argtypes = [wintypes.HANDLE]
+    _SetEvent.restype = wintypes.BOOL
+    _WaitForSingleObject = _kernel32.WaitForSingleObject
+    _WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+    _WaitForSingleObject.restype = wintypes.DWORD
+
+    # Lock watcher: hidden window + message pump (see _lock_watch_loop)
+    _WNDPROC = ctypes.WINFUNCTYPE(
+        wintypes.LPARAM, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM,
+    )
+
+    class _WNDCLASSW(ctypes.Structure):
+        _fields_ = [
+            ("style",         wintypes.UINT),
+            ("lpfnWndProc",   _WNDPROC),
+            ("cbClsExtra",    ctypes.c_int),
+            ("cbWndExtra",    ctypes.c_int),
+            ("hInstance",     wintypes.HINSTANCE),
+            ("hIcon",         wintypes.HICON),
+            ("hCursor",       wintypes.HANDLE),
+            ("hbrBackground", wintypes.HBRUSH),
+            ("lpszMenuName",  wintypes.LPCWSTR),
+            ("lpszClassName", wintypes.LPCWSTR),
+        ]
+
+    _DefWindowProcW = _user32.DefWindowProcW
+    _DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    _DefWindowProcW.restype = wintypes.LPARAM
+    _RegisterClassW = _user32.RegisterClassW
+    _RegisterClassW.argtypes = [ctypes.POINTER(_WNDCLASSW)]
+    _RegisterClassW.restype = wintypes.ATOM
+    _CreateWindowExW = _user32.CreateWindowExW
+    _CreateWindowExW.argtypes = [
+        wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+        wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID,
+    ]
+    _CreateWindowExW.restype = wintypes.HWND
+    _DestroyWindow = _user32.DestroyWindow
+    _DestroyWindow.argtypes = [wintypes.HWND]
+    _DestroyWindow.restype = wintypes.BOOL
+    _MsgWaitForMultipleObjects = _user32.MsgWaitForMultipleObjects
+    _MsgWaitForMultipleObjects.argtypes = [
+        wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL,
+        wintypes.DWORD, wintypes.DWORD,
+    ]
+    _MsgWaitForMultipleObjects.restype = wintypes.DWORD
+    _PeekMessageW = _user32.PeekMessageW
+    _PeekMessageW.argtypes = [
+        ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT, wintypes.UINT,
+    ]
+    _PeekMessageW.restype = wintypes.BOOL
+    _TranslateMessage = _user32.TranslateMessage
+    _TranslateMessage.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    _TranslateMessage.restype = wintypes.BOOL
+    _DispatchMessageW = _user32.DispatchMessageW
+    _DispatchMessageW.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    _DispatchMessageW.restype = wintypes.LPARAM
+    _wtsapi32 = ctypes.windll.wtsapi32
+    _WTSRegisterSessionNotification = _wtsapi32.WTSRegisterSessionNotification
+    _WTSRegisterSessionNotification.argtypes = [wintypes.HWND, wintypes.DWORD]
+    _WTSRegisterSessionNotification.restype = wintypes.BOOL
+    _WTSUnRegisterSessionNotification = _wtsapi32.WTSUnRegisterSessionNotification
+    _WTSUnRegisterSessionNotification.argtypes = [wintypes.HWND]
+    _WTSUnRegisterSessionNotification.restype = wintypes.BOOL
+
 
 # ─── Install directory ───────────────────────────────────────────
 
@@ -66,6 +170,7 @@ def setup_autostart():
             _create_registry_run(exe_path)
 
         _remove_old_registry_entry()
+        _invalidate_autostart_cache()
 
     except Exception as e:
         log.warning("Could not set auto-start: %s", e)
@@ -132,8 +237,13 @@ def _remove_old_registry_entry():
         pass
 
 
+@lru_cache(maxsize=1)
 def is_autostart_enabled():
-    """Check if auto-start is configured (Task Scheduler or Registry)."""
+    """Check if auto-start is configured (Task Scheduler or Registry).
+
+    Cached for the process lifetime: spawning schtasks and reading the
+    registry is slow, and only setup_autostart() changes the answer.
+    """
     # Check Task Scheduler
     try:
         result = subprocess.run(
@@ -162,6 +272,10 @@ def is_autostart_enabled():
     return False
 
 
+def _invalidate_autostart_cache():
+    is_autostart_enabled.cache_clear()
+
+
 # ─── Single Instance Lock ────────────────────────────────────────
 
 _instance_mutex = None
@@ -204,10 +318,8 @@ def ensure_single_instance():
         return True
 
     try:
-        _instance_mutex = ctypes.windll.kernel32.CreateMutexW(
-            None, False, _MUTEX_NAME
-        )
-        last_error = ctypes.windll.kernel32.GetLastError()
+        _instance_mutex = _CreateMutexW(None, False, _MUTEX_NAME)
+        last_error = _GetLastError()
 
         if last_error == 183:  # ERROR_ALREADY_EXISTS
             if _is_exe_running_elsewhere():
@@ -216,10 +328,8 @@ def ensure_single_instance():
 
             # Stale mutex (Fast Startup / unclean shutdown) — reclaim
             log.info("Stale mutex detected (no running instance) — reclaiming")
-            ctypes.windll.kernel32.CloseHandle(_instance_mutex)
-            _instance_mutex = ctypes.windll.kernel32.CreateMutexW(
-                None, True, _MUTEX_NAME
-            )
+            _CloseHandle(_instance_mutex)
+            _instance_mutex = _CreateMutexW(None, True, _MUTEX_NAME)
             return True
         return True
     except Exception:
@@ -274,60 +384,281 @@ def _is_logonui_running():
 def is_system_locked():
     """Check if the Windows workstation is locked.
 
-    Primary method: scan the process list for LogonUI.exe.
-    Fallback: OpenInputDesktop (less reliable on modern Windows 10/11).
+    When the session watcher is running (start_lock_watcher), this is a
+    plain flag read kept current by WM_WTSSESSION_CHANGE notifications.
+    Otherwise it falls back to polling (_poll_system_locked).
     """
     if sys.platform != "win32":
         return False
+    if _lock_watch_active:
+        return _session_locked
+    return _poll_system_locked()
+
+
+def consume_lock_change():
+    """Return True (once) if the watcher saw a lock/unlock since the last call.
+
+    Lets the main thread react to a session change on its next input poll
+    instead of waiting for the following idle tick.
+    """
+    if _lock_changed.is_set():
+        _lock_changed.clear()
+        return True
+    return False
+
+
+def _poll_system_locked():
+    """Poll the lock state.
+
+    Primary method: scan the process list for LogonUI.exe.
+    Fallback: OpenInputDesktop (less reliable on modern Windows 10/11).
+    """
     try:
         if _is_logonui_running():
             return True
-        hDesktop = ctypes.windll.user32.OpenInputDesktop(0, False, 0x0001)
-        if hDesktop == 0:
+        hDesktop = _OpenInputDesktop(0, False, 0x0001)
+        if not hDesktop:
             return True
-        ctypes.windll.user32.CloseDesktop(hDesktop)
+        _CloseDesktop(hDesktop)
         return False
     except Exception:
         return False
 
 
+# ─── Event-driven lock detection (WTS session notifications) ─────
+
+_WM_WTSSESSION_CHANGE = 0x02B1
+_WTS_SESSION_LOCK = 0x7
+_WTS_SESSION_UNLOCK = 0x8
+_NOTIFY_FOR_THIS_SESSION = 0
+_LOCK_WATCH_CLASS = "WinSysHealthSessionWatch"
+_LOCK_RESYNC_MS = 60_000     # Safety-net re-poll if a notification is ever missed
+_LOCK_REGISTER_RETRY_MS = 30_000  # Retry WTS registration (not ready yet at logon)
+_QS_ALLINPUT = 0x04FF
+_PM_REMOVE = 0x0001
+_WAIT_OBJECT_0 = 0x0
+_WAIT_TIMEOUT = 0x102
+
+_lock_watch_active = False   # True once WTS notifications are registered
+_session_locked = False      # Written only by the watcher thread
+_lock_wndproc = None         # ctypes callback; kept alive for the whole process
+_lock_class_atom = 0         # Window class, registered once per process
+_lock_watch_thread = None
+_lock_watch_stop = None      # Win32 manual-reset event; set to end the watcher
+_lock_changed = threading.Event()  # Set by the watcher on every lock/unlock flip
+
+
+def start_lock_watcher():
+    """Start a background thread that tracks lock/unlock via WTS events.
+
+    Replaces the per-tick LogonUI.exe process scan with a push
+    notification.  If registration fails (e.g. Terminal Services not
+    ready yet at logon), is_system_locked() polls until a retry succeeds.
+    """
+    global _lock_watch_thread, _lock_watch_stop
+    if sys.platform != "win32":
+        return False
+    # Survives run_with_auto_restart(): one watcher per process
+    if _lock_watch_thread is not None and _lock_watch_thread.is_alive():
+        return True
+    if not _lock_watch_stop:
+        _lock_watch_stop = _CreateEventW(None, True, False, None)
+    _lock_watch_thread = threading.Thread(
+        target=_lock_watch_loop, name="lock-watch", daemon=True,
+    )
+    _lock_watch_thread.start()
+    return True
+
+
+def stop_lock_watcher():
+    """Wake the watcher thread and let it unregister and exit."""
+    if sys.platform != "win32" or not _lock_watch_stop:
+        return
+    try:
+        _SetEvent(_lock_watch_stop)
+        if _lock_watch_thread is not None:
+            _lock_watch_thread.join(timeout=2)
+    except Exception as e:
+        log.warning("Lock watcher stop failed: %s", e)
+
+
+def _lock_wndproc_impl(hwnd, msg, wparam, lparam):
+    global _session_locked
+    if msg == _WM_WTSSESSION_CHANGE:
+        if wparam == _WTS_SESSION_LOCK:
+            _session_locked = True
+            _lock_changed.set()
+        elif wparam == _WTS_SESSION_UNLOCK:
+            _session_locked = False
+            _lock_changed.set()
+        return 0
+    return _DefWindowProcW(hwnd, msg, wparam, lparam)
+
+
+def _register_lock_window_class(hinstance):
+    """Register the watcher's window class once; returns its atom (0 = failed).
+
+    The class and its WNDPROC thunk live for the whole process: a watcher
+    restarted by run_with_auto_restart() reuses them, so the class never
+    points at a freed callback.
+    """
+    global _lock_wndproc, _lock_class_atom
+    if _lock_class_atom:
+        return _lock_class_atom
+    if _lock_wndproc is None:
+        _lock_wndproc = _WNDPROC(_lock_wndproc_impl)
+    wc = _WNDCLASSW()
+    wc.lpfnWndProc = _lock_wndproc
+    wc.hInstance = hinstance
+    wc.lpszClassName = _LOCK_WATCH_CLASS
+    _lock_class_atom = _RegisterClassW(ctypes.byref(wc))
+    if not _lock_class_atom:
+        log.warning("Lock watcher: RegisterClass failed (error %d)", _GetLastError())
+    return _lock_class_atom
+
+
+def _lock_watch_loop():
+    global _lock_watch_active, _session_locked
+
+    hinstance = _GetModuleHandleW(None)
+    hwnd = None
+    registered = False
+    try:
+        if not _register_lock_window_class(hinstance):
+            log.warning("Lock watcher: no window class — polling instead")
+            return
+
+        # Hidden top-level window (never shown). Message-only windows are
+        # not reliably delivered WM_WTSSESSION_CHANGE on all builds.
+        hwnd = _CreateWindowExW(
+            0, _LOCK_WATCH_CLASS, _LOCK_WATCH_CLASS, 0,
+            0, 0, 0, 0, None, None, hinstance, None,
+        )
+        if not hwnd:
+            log.warning("Lock watcher: CreateWindowEx failed — polling instead")
+            return
+        warned = False
+        while not _WTSRegisterSessionNotification(hwnd, _NOTIFY_FOR_THIS_SESSION):
+            if not warned:
+                log.warning("Lock watcher: WTS registration failed — polling until retry succeeds")
+                warned = True
+            if _WaitForSingleObject(_lock_watch_stop, _LOCK_REGISTER_RETRY_MS) == _WAIT_OBJECT_0:
+                return
+        registered = True
+
+        _session_locked = _poll_system_locked()
+        _lock_watch_active = True
+        log.info("Lock watcher started (WTS session notifications)")
+
+        # Block until a window message arrives, stop is signalled, or the
+        # resync timeout elapses — no periodic wakeups in between.
+        handles = (wintypes.HANDLE * 1)(_lock_watch_stop)
+        msg = wintypes.MSG()
+        msg_ref = ctypes.byref(msg)
+        while True:
+            rc = _MsgWaitForMultipleObjects(
+                1, handles, False, _LOCK_RESYNC_MS, _QS_ALLINPUT,
+            )
+            if rc == _WAIT_OBJECT_0:
+                break
+            if rc == _WAIT_TIMEOUT:
+                locked = _poll_system_locked()
+                if locked != _session_locked:
+                    _session_locked = locked
+                    _lock_changed.set()
+                continue
+            if rc != _WAIT_OBJECT_0 + 1:
+                log.warning("Lock watcher wait failed (rc=%s) — polling instead", rc)
+                break
+            while _PeekMessageW(msg_ref, None, 0, 0, _PM_REMOVE):
+                _TranslateMessage(msg_ref)
+                _DispatchMessageW(msg_ref)
+    except Exception as e:
+        log.warning("Lock watcher error — polling instead: %s", e)
+    finally:
+        _lock_watch_active = False
+        # The window class stays registered (see _register_lock_window_class).
+        try:
+            if registered and not _WTSUnRegisterSessionNotification(hwnd):
+                log.warning("Lock watcher: WTSUnRegisterSessionNotification failed (error %d)",
+                            _GetLastError())
+            if hwnd and not _DestroyWindow(hwnd):
+                log.warning("Lock watcher: DestroyWindow failed (error %d)", _GetLastError())
+        except Exception as e:
+            log.warning("Lock watcher cleanup failed: %s", e)
+
+
 # ─── Auto-clicker / cheat process detection ─────────────────────
 
-def _get_running_process_names():
-    """Return a set of lowercase process names currently running."""
+def _find_running_processes(known_names):
+    """Return the lowercase names in known_names that are currently running.
+
+    Matches while walking the snapshot, so only hits are collected rather
+    than a set of every process name on the machine.
+    """
     if sys.platform != "win32":
         return set()
-    names = set()
+    found = set()
     kernel32 = ctypes.windll.kernel32
     snapshot = kernel32.CreateToolhelp32Snapshot(_TH32CS_SNAPPROCESS, 0)
     if snapshot in (0, -1):
-        return names
+        return found
     try:
         pe = _PROCESSENTRY32W()
         pe.dwSize = ctypes.sizeof(pe)
-        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(pe))
+        pe_ref = ctypes.byref(pe)
+        ok = kernel32.Process32FirstW(snapshot, pe_ref)
         while ok:
-            names.add(pe.szExeFile.lower())
-            ok = kernel32.Process32NextW(snapshot, ctypes.byref(pe))
+            name = pe.szExeFile.lower()
+            if name in known_names:
+                found.add(name)
+            ok = kernel32.Process32NextW(snapshot, pe_ref)
     finally:
         kernel32.CloseHandle(snapshot)
-    return names
+    return found
+
+
+def _get_pid_set():
+    """Return a frozenset of running PIDs (one EnumProcesses call), or None."""
+    size = 1024
+    while True:
+        pids = (wintypes.DWORD * size)()
+        needed = wintypes.DWORD()
+        if not _EnumProcesses(pids, ctypes.sizeof(pids), ctypes.byref(needed)):
+            return None
+        count = needed.value // ctypes.sizeof(wintypes.DWORD)
+        if count < size:            # a full buffer may have been truncated
+            return frozenset(pids[:count])
+        size *= 2
+
+
+# (pid set, known_names, result) of the last full scan
+_last_process_scan = (None, None, [])
 
 
 def detect_autoclicker_processes(known_names):
     """Check if any known auto-clicker process is running.
 
+    The full name scan only runs when the set of PIDs has changed since the
+    previous call; on a quiet machine most calls reuse the last result.
+
     Args:
         known_names: set of lowercase process names to look for.
 
     Returns:
         List of detected process names (empty = clean).
     """
+    global _last_process_scan
     if sys.platform != "win32":
         return []
     try:
-        running = _get_running_process_names()
-        return sorted(running & known_names)
+        pids = _get_pid_set()
+        last_pids, last_names, last_found = _last_process_scan
+        if pids is not None and pids == last_pids and known_names is last_names:
+            return list(last_found)
+        found = sorted(_find_running_processes(known_names))
+        _last_process_scan = (pids, known_names, found)
+        return list(found)
     except Exception:
         return []
 
@@ -350,8 +681,8 @@ def get_system_idle_seconds():
     try:
         lii = _LASTINPUTINFO()
         lii.cbSize = ctypes.sizeof(_LASTINPUTINFO)
-        if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii)):
-            tick_now = ctypes.windll.kernel32.GetTickCount()
+        if _GetLastInputInfo(ctypes.byref(lii)):
+            tick_now = _GetTickCount()
             elapsed_ms = (tick_now - lii.dwTime) & 0xFFFFFFFF
             return elapsed_ms / 1000.0
         return -1
@@ -4,18 +4,22 @@ IdlePopup — fullscreen break reason form.
 Created and managed EXCLUSIVELY on the Tkinter main thread.
 Never instantiated from a background thread.
 
-Network calls (break_reason) are dispatched to a worker thread,
-with result polling via root.after() — the UI never blocks.
+The widget tree is built on first show and then kept: later popups just
+reset the form and deiconify the same Toplevel.
+
+The break-reason call is handed to the app (submit_reason → Future on
+its break-log worker), with result polling via root.after() — the UI
+never blocks.
 Hardened against widget-destroyed crashes with TclError guards.
 """
 
 import time
-import threading
 import tkinter as tk
+from tkinter import ttk
 
 from .constants import THEME, BREAK_REASONS
-from .config import log, resource_path
-from .api import send_break_reason
+from .config import log
+from .assets import load_logo
 
 
 _SUBMIT_TIMEOUT = 50  # Max seconds to wait for API before forcing failure
@@ -24,45 +28,64 @@ _SUBMIT_TIMEOUT = 50  # Max seconds to wait for API before forcing failure
 class IdlePopup:
     """
     Lifecycle (all on main thread):
-      show()         → creates Toplevel
+      show()         → builds Toplevel once, else resets + deiconifies it
       _on_submit()   → validates, starts async API call, polls for result
-      _finish()      → destroys Toplevel, calls on_submitted callback
+      _finish()      → withdraws Toplevel, calls on_submitted callback
     """
 
-    def __init__(self, root, config, on_submitted):
+    def __init__(self, root, config, on_submitted, submit_reason):
         self._root = root
         self._config = config
         self._on_submitted = on_submitted
+        self._submit_reason = submit_reason   # (reason, custom) → Future[bool]
+        self._submit_future = None
         self._toplevel = None
+        self._visible = False
         self._submit_result = None
         self._submit_start_time = 0.0
 
     @property
     def is_visible(self):
-        return self._toplevel is not None
+        return self._visible
 
     def show(self):
         """Show the fullscreen popup. Must be called from main thread."""
-        if self._toplevel is not None:
+        if self._visible:
             return
 
         self._submit_result = None
         self._submit_start_time = 0.0
 
         try:
-            self._build_ui()
+            top = self._toplevel
+            if top is None or not top.winfo_exists():
+                self._build_ui()
+            else:
+                self._reset_form()
+                top.deiconify()
+                top.attributes("-topmost", True)
+                top.lift()
+            self._visible = True
+            log.info("Popup shown (main thread)")
         except Exception as e:
-            log.error("Failed to build popup UI: %s", e, exc_info=True)
+            log.error("Failed to show popup UI: %s", e, exc_info=True)
             self._toplevel = None
 
     def hide(self):
-        """Destroy the popup Toplevel. Must be called from main thread."""
-        if self._toplevel is not None:
+        """Withdraw the popup Toplevel (kept for reuse). Main thread only."""
+        if self._visible:
             try:
-                self._toplevel.destroy()
+                self._toplevel.withdraw()
             except Exception:
-                pass
-            self._toplevel = None
+                self._toplevel = None
+            self._visible = False
+
+    def _reset_form(self):
+        """Clear the previous submission before the form is reused."""
+        self._reason_var.set("")
+        self._custom_var.set("")
+        self._safe_widget_config(self._status_label, text="")
+        self._safe_widget_config(self._submit_btn, state="disabled")
 
     # ─── UI construction ─────────────────────────────────────
 
@@ -75,14 +98,44 @@ class IdlePopup:
         top.attributes("-fullscreen", True)
         top.attributes("-topmost", True)
 
-        def stay_on_top():
+        # Re-assert only when something actually takes focus or covers the
+        # form — no 1Hz timer waking the CPU for the life of the popup.
+        # Bursts (FocusOut + Visibility from one window switch) collapse into
+        # a single idle-time re-raise, and Tab/clicks between the form's own
+        # fields (which also emit FocusOut) are skipped.
+        raise_pending = [False]
+
+        def reassert():
+            raise_pending[0] = False
             try:
                 top.attributes("-topmost", True)
                 top.lift()
-                top.after(1000, stay_on_top)
             except tk.TclError:
                 pass
-        top.after(500, stay_on_top)
+
+        def schedule_reassert():
+            if not raise_pending[0]:
+                raise_pending[0] = True
+                top.after_idle(reassert)
+
+        def check_focus():
+            # Focus has settled by idle time; None means another app took it
+            try:
+                lost = top.focus_displayof() is None
+            except tk.TclError:
+                return
+            if lost:
+                schedule_reassert()
+
+        def on_focus_out(event):
+            top.after_idle(check_focus)
+
+        def on_visibility(event):
+            if event.state != "VisibilityUnobscured":
+                schedule_reassert()
+
+        top.bind("<FocusOut>", on_focus_out)
+        top.bind("<Visibility>", on_visibility)
 
         top.protocol("WM_DELETE_WINDOW", lambda: None)
         top.bind("<Alt-F4>", lambda e: "break")
@@ -105,11 +158,7 @@ class IdlePopup:
         header_content.pack(expand=True)
 
         try:
-            logo_path = resource_path("gds.png")
-            logo_img = tk.PhotoImage(file=logo_path)
-            # Target ~80px logo (1020/80 ≈ 12.75 → subsample by 13)
-            scale = max(1, logo_img.width() // 80)
-            logo_img = logo_img.subsample(scale, scale)
+            logo_img = load_logo(top, 80)
             top._logo = logo_img
             tk.Label(header_content, image=logo_img,
                      bg=THEME["header_bg"]).pack(side="left", padx=(0, 18))
@@ -144,24 +193,33 @@ class IdlePopup:
         self._reason_var = tk.StringVar(value="")
         self._custom_var = tk.StringVar(value="")
 
-        radio_frame = tk.Frame(body, bg=THEME["bg_dark"],
-                               highlightbackground=THEME["border"], highlightthickness=1)
-        radio_frame.pack(fill="x")
-
-        for i, reason in enumerate(BREAK_REASONS):
-            rb_bg = THEME["bg_dark"]
-            rb = tk.Radiobutton(
-                radio_frame, text=reason, variable=self._reason_var, value=reason,
-                font=("Segoe UI", 13), bg=rb_bg,
-                fg=THEME["text_primary"], activebackground=THEME["bg_hover"],
-                activeforeground=THEME["text_primary"],
-                selectcolor=THEME["bg_input"],
-                anchor="w", padx=18, pady=8,
-                command=lambda: self._safe_widget_config(self._submit_btn, state="normal"),
-            )
-            rb.pack(fill="x")
-            if i < len(BREAK_REASONS) - 1:
-                tk.Frame(radio_frame, bg=THEME["border"], height=1).pack(fill="x")
+        # One readonly dropdown instead of a Radiobutton per reason
+        style = ttk.Style(top)
+        style.configure(
+            "Break.TCombobox", padding=(12, 8),
+            fieldbackground=THEME["bg_input"], background=THEME["bg_dark"],
+            foreground=THEME["text_primary"], arrowcolor=THEME["text_primary"],
+        )
+        style.map(
+            "Break.TCombobox",
+            fieldbackground=[("readonly", THEME["bg_input"])],
+            foreground=[("readonly", THEME["text_primary"])],
+            selectbackground=[("readonly", THEME["bg_input"])],
+            selectforeground=[("readonly", THEME["text_primary"])],
+        )
+        top.option_add("*TCombobox*Listbox.font", ("Segoe UI", 13))
+
+        combo_frame = tk.Frame(body, bg=THEME["border"], padx=1, pady=1)
+        combo_frame.pack(fill="x")
+        reason_combo = ttk.Combobox(
+            combo_frame, textvariable=self._reason_var, values=BREAK_REASONS,
+            state="readonly", style="Break.TCombobox", font=("Segoe UI", 13),
+        )
+        reason_combo.pack(fill="x")
+        reason_combo.bind(
+            "<<ComboboxSelected>>",
+            lambda e: self._safe_widget_config(self._submit_btn, state="normal"),
+        )
 
         tk.Label(body, text="Enter reason (required)",
                  font=("Segoe UI", 13, "bold"),
@@ -211,8 +269,6 @@ class IdlePopup:
                  font=("Segoe UI", 9), bg=THEME["bg_card"],
                  fg=THEME["text_dark"]).pack(expand=True)
 
-        log.info("Popup shown (main thread)")
-
     # ─── Safe widget helpers ─────────────────────────────────
 
     def _safe_widget_config(self, widget, **kwargs):
@@ -226,7 +282,7 @@ class IdlePopup:
 
     def _on_submit(self):
         """Validate → start async API call → poll for result."""
-        if self._toplevel is None:
+        if not self._visible:
             return
 
         try:
@@ -253,30 +309,26 @@ class IdlePopup:
         self._safe_widget_config(self._submit_btn, state="disabled")
         self._safe_widget_config(self._status_label, text="Submitting...", fg=THEME["primary"])
         self._submit_result = None
-        self._submit_start_time = time.time()
-
-        config = self._config
-        r, c = reason, custom
-
-        def do_call():
-            try:
-                self._submit_result = send_break_reason(config, r, c)
-            except Exception as e:
-                log.error("Break reason submit thread error: %s", e)
-                self._submit_result = False
-
-        threading.Thread(target=do_call, daemon=True).start()
+        self._submit_start_time = time.monotonic()
+        self._submit_future = self._submit_reason(reason, custom)
         self._poll_submit(reason, custom)
 
     def _poll_submit(self, reason, custom):
         """Poll for API result without blocking the main thread."""
-        if self._toplevel is None:
+        if not self._visible:
             self._finish(reason, custom)
             return
 
+        if self._submit_result is None and self._submit_future.done():
+            try:
+                self._submit_result = bool(self._submit_future.result())
+            except Exception as e:
+                log.error("Break reason submit error: %s", e)
+                self._submit_result = False
+
         # Timeout guard: if the API hangs, force failure after _SUBMIT_TIMEOUT seconds
         if self._submit_result is None:
-            if time.time() - self._submit_start_time > _SUBMIT_TIMEOUT:
+            if time.monotonic() - self._submit_start_time > _SUBMIT_TIMEOUT:
                 log.warning("Submit poll timed out after %ds", _SUBMIT_TIMEOUT)
                 self._submit_result = False
             else:
@@ -0,0 +1,113 @@
+"""
+Downtime recovery — records a power-off / restart gap as a break.
+
+Runs once at startup, before the Tk app is built, so it imports nothing
+GUI- or input-related.
+"""
+
+import time
+
+from .constants import DOWNTIME_MIN_GAP_SEC, PKT
+from .config import log
+from .api import send_break_start, send_break_end, BREAK_SENT, BREAK_BUFFERED
+from . import network
+
+_PKT_OFFSET_SEC = int(PKT.utcoffset(None).total_seconds())
+_DAY_SEC = 86400
+
+
+def recover_downtime(config, shift_info=None):
+    """
+    Check for a power-off/restart gap since last run.
+    If the gap is > DOWNTIME_MIN_GAP_SEC, create a completed break record
+    covering only the portion of downtime that falls inside the shift+grace
+    window.  Time outside the shift is silently ignored.
+    """
+    emp_code = config["empCode"]
+    last_alive = network.get_last_alive_ts(emp_code)
+    if last_alive is None:
+        log.info("No previous alive timestamp — first run or reset")
+        network.save_alive_ts(emp_code)
+        return
+
+    gap = time.time() - last_alive
+    if gap < DOWNTIME_MIN_GAP_SEC:
+        log.info("Downtime gap %.0fs (< %ds threshold) — normal restart", gap, DOWNTIME_MIN_GAP_SEC)
+        network.save_alive_ts(emp_code)
+        return
+
+    log.warning(
+        "Detected %.0fs power-off gap (%.1f min) — creating recovery break",
+        gap, gap / 60,
+    )
+
+    # Clip recovery to shift+grace window if shift info is available.
+    # This prevents recording 17+ hour "breaks" that span past shift end.
+    effective_start = last_alive
+    if shift_info:
+        try:
+            grace_sec = shift_info.get("gracePeriod", 20) * 60
+            shift_end_str = shift_info.get("shiftEnd")      # "HH:MM"
+            shift_start_str = shift_info.get("shiftStart")   # "HH:MM"
+            crosses = shift_info.get("crossesMidnight", False)
+
+            if shift_end_str and shift_start_str:
+                sh, sm = map(int, shift_start_str.split(":"))
+                eh, em = map(int, shift_end_str.split(":"))
+
+                # PKT has no DST, so "midnight of last_alive's day" is plain
+                # arithmetic on the epoch value.
+                into_day = (last_alive + _PKT_OFFSET_SEC) % _DAY_SEC
+                midnight = last_alive - into_day
+                shift_start_ts = midnight + sh * 3600 + sm * 60
+                shift_end_ts = midnight + eh * 3600 + em * 60
+
+                if crosses:
+                    # Before noon the shift started the previous evening;
+                    # otherwise it started today and ends tomorrow.
+                    if into_day < 12 * 3600:
+                        shift_start_ts -= _DAY_SEC
+                    else:
+                        shift_end_ts += _DAY_SEC
+
+                grace_end_ts = shift_end_ts + grace_sec
+
+                # Skip entirely if last_alive was already past grace end
+                if last_alive >= grace_end_ts:
+                    log.info(
+                        "Power-off at %.0f was after shift grace end (%.0f) — no recovery break needed",
+                        last_alive, grace_end_ts,
+                    )
+                    network.save_alive_ts(emp_code)
+                    return
+
+                if effective_start < shift_start_ts:
+                    effective_start = shift_start_ts
+
+                clipped_gap = grace_end_ts - effective_start
+                log.info(
+                    "Recovery clipped to shift window: %.1f min (was %.1f min raw)",
+                    clipped_gap / 60, gap / 60,
+                )
+        except Exception as e:
+            log.warning("Shift-clip calculation failed (using raw gap): %s", e)
+
+    try:
+        started = send_break_start(
+            config, effective_start,
+            "General", "System Power Off / Restart (auto-detected)",
+        )
+        if started == BREAK_SENT:
+            send_break_end(config, effective_start)
+            log.info("Downtime recovery break recorded successfully")
+        elif started == BREAK_BUFFERED:
+            # The end follows the start into the buffer, so the replayed
+            # break is closed too instead of left open.
+            send_break_end(config, effective_start, buffer_only=True)
+            log.warning("Downtime recovery break not delivered — will retry via buffer")
+        else:
+            log.warning("Downtime recovery break refused by the server")
+    except Exception as e:
+        log.error("Downtime recovery error: %s", e)
+
+    network.save_alive_ts(emp_code)
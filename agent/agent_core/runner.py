@@ -11,9 +11,8 @@ from .constants import AGENT_VERSION
 from .config import log, safe_print, load_config
 from . import http_client
 from . import network
-from .enrollment import gui_enroll
 from .platform_win import ensure_single_instance, setup_autostart, is_autostart_enabled
-from .app import AgentApp, recover_downtime
+from .recovery import recover_downtime
 
 
 def main():
@@ -28,6 +27,7 @@ def main():
     config = load_config()
 
     if not config:
+        from .enrollment import gui_enroll      # Tk, only on first run
         config = gui_enroll()
         if not config:
             sys.exit(1)
@@ -60,13 +60,12 @@ def main():
             log.warning("Buffer flush failed: %s", e)
 
     # ── Start the agent ──
+    # Tk and pynput load here, after recovery and the buffer flush have run
+    from .app import AgentApp
     app = AgentApp(config)
 
     if shift_info:
-        app.state.shift_start = shift_info.get("shiftStart")
-        app.state.shift_end = shift_info.get("shiftEnd")
-        app.state.shift_grace_min = shift_info.get("gracePeriod", 20)
-        app.state.shift_crosses_midnight = shift_info.get("crossesMidnight", False)
+        app.state.apply_shift_info(shift_info)
 
     app.run()
 
@@ -109,4 +108,6 @@ def run_with_auto_restart():
             log.info("Restarting in %ds (crash %d)...", wait, crash_count)
             time.sleep(wait)
 
-            http_client.http = http_client.reset_session(http_client.http)
+            # Keep the warm keep-alive pool unless it can no longer verify TLS
+            if http_client.refresh_session_if_stale():
+                log.info("HTTP session rebuilt (CA bundle missing)")
@@ -1,9 +1,11 @@
 """
 AgentState — single source of truth for all agent state.
 
-All mutations happen on the Tkinter main thread. No locks needed.
+All mutations happen on the Tkinter main thread. No locks needed — the one
+field the heartbeat sender thread touches (hb_failing) is a threading.Event.
 """
 
+import threading
 import time
 from dataclasses import dataclass, field
 from typing import Optional
@@ -12,7 +14,6 @@ from typing import Optional
 @dataclass
 class AgentState:
     # ── Input tracking ────────────────────────────────────────
-    last_input_ts: float = field(default_factory=time.time)
     last_monotonic_ts: float = field(default_factory=time.monotonic)
 
     # ── Popup lifecycle (prevents double-show) ────────────────
@@ -25,27 +26,32 @@ class AgentState:
     break_start_time: float = 0.0
 
     # ── Heartbeat ─────────────────────────────────────────────
-    last_heartbeat_time: float = 0.0
+    last_heartbeat_time: float = 0.0    # time.monotonic() of last send
     last_heartbeat_state: str = ""
-    heartbeat_in_flight: bool = False
 
     # ── System lock ───────────────────────────────────────────
     system_locked: bool = False
     was_locked: bool = False
     lock_popup_handled: bool = False
-    lock_start_time: float = 0.0        # When lock began (filters brief UAC prompts)
+    lock_start_time: float = 0.0        # time.monotonic() when lock began
 
     # ── Connectivity ──────────────────────────────────────────
     online: bool = True
     offline_since: float = 0.0          # time.time() when we went offline
     offline_break_started: bool = False  # True if we auto-opened a break for disconnect
-    consecutive_hb_failures: int = 0
+    # Set by the heartbeat sender after consecutive failed sends; the main
+    # thread then verifies connectivity and clears it.
+    hb_failing: threading.Event = field(default_factory=threading.Event)
 
     # ── Shift info (fetched from server, None = always-on) ────
     shift_start: Optional[str] = None   # "HH:MM" or None
     shift_end: Optional[str] = None
     shift_grace_min: int = 20
     shift_crosses_midnight: bool = False
+    # Same bounds as minutes since midnight, parsed once per fetch for the
+    # per-tick shift check. None if missing or unparseable.
+    shift_start_min: Optional[int] = None
+    shift_end_min: Optional[int] = None
 
     @property
     def idle_seconds(self) -> float:
@@ -53,13 +59,15 @@ class AgentState:
         Seconds since last real input (monotonic clock).
         Capped at 600s to absorb sleep/resume clock jumps.
         """
-        raw = time.monotonic() - self.last_monotonic_ts
-        return min(raw, 600.0)
+        return self.idle_seconds_at(time.monotonic())
 
-    def record_activity(self):
-        """Mark that real user input just happened."""
-        self.last_input_ts = time.time()
-        self.last_monotonic_ts = time.monotonic()
+    def idle_seconds_at(self, now):
+        """idle_seconds for a time.monotonic() value the caller already read."""
+        return min(max(0.0, now - self.last_monotonic_ts), 600.0)
+
+    def record_activity(self, now=None):
+        """Mark that real user input just happened (at monotonic `now`)."""
+        self.last_monotonic_ts = time.monotonic() if now is None else now
 
     def can_show_popup(self) -> bool:
         """Whether a new popup is allowed right now."""
@@ -98,4 +106,24 @@ class AgentState:
 
     def mark_online(self):
         self.online = True
-        self.consecutive_hb_failures = 0
+        self.hb_failing.clear()
+
+    # ── Shift info ────────────────────────────────────────────
+
+    def apply_shift_info(self, info):
+        """Store a fetch_shift_info() result."""
+        self.shift_start = info.get("shiftStart")
+        self.shift_end = info.get("shiftEnd")
+        self.shift_grace_min = info.get("gracePeriod", 20)
+        self.shift_crosses_midnight = info.get("crossesMidnight", False)
+        self.shift_start_min = _hhmm_to_minutes(self.shift_start)
+        self.shift_end_min = _hhmm_to_minutes(self.shift_end)
+
+
+def _hhmm_to_minutes(value):
+    """'HH:MM' → minutes since midnight, or None."""
+    try:
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
@@ -8,43 +8,55 @@ PRIVACY: ONLY statistical patterns — NO content, NO keylogging.
 """
 
 import math
+import time
+from bisect import bisect_right
 from collections import deque
+from itertools import islice
 
-from .constants import MOVE_THROTTLE_SEC, PATTERN_BUFFER_SIZE
+from .constants import PATTERN_BUFFER_SIZE
+
+# A second score request this soon after the last one (e.g. a state-change
+# heartbeat right after an unlock tick) reuses that score: the counters were
+# just reset, and scoring a near-empty window would read as "no activity".
+_SCORE_REUSE_SEC = 1.0
 
 
 class ActivityTracker:
     """Pure scoring engine. Receives events, computes activity quality 0-100."""
 
     def __init__(self):
-        self._click_times = deque(maxlen=PATTERN_BUFFER_SIZE)
+        # Inter-click deltas, stored at click time (N clicks → N-1 intervals)
+        self._click_intervals = deque(maxlen=PATTERN_BUFFER_SIZE - 1)
+        self._last_click_ts = None
         self._click_positions = deque(maxlen=PATTERN_BUFFER_SIZE)
         self._move_positions = deque(maxlen=PATTERN_BUFFER_SIZE)
         self._key_count = 0
         self._mouse_count = 0
         self._scroll_count = 0
         self._last_score = 100
-        self._last_move_time = 0.0
+        self._last_score_at = None      # time.monotonic() of the last calculation
 
     # ── Event handlers (called from main thread only) ────────
 
     def on_mouse_move(self, x, y, ts):
-        if ts - self._last_move_time < MOVE_THROTTLE_SEC:
-            return
-        self._last_move_time = ts
+        # ts is time.monotonic() (see listeners.on_move) — only deltas matter
+        # here. Moves arrive already throttled to MOVE_THROTTLE_SEC there.
         self._mouse_count += 1
         self._move_positions.append((x, y, ts))
 
     def on_mouse_click(self, x, y, ts):
+        # ts is time.monotonic(), like on_mouse_move's.
         self._mouse_count += 1
-        self._click_times.append(ts)
+        if self._last_click_ts is not None:
+            self._click_intervals.append(ts - self._last_click_ts)
+        self._last_click_ts = ts
         self._click_positions.append((x, y))
 
-    def on_mouse_scroll(self):
-        self._scroll_count += 1
+    def on_mouse_scroll(self, count=1):
+        self._scroll_count += count
 
-    def on_key_event(self):
-        self._key_count += 1
+    def on_key_event(self, count=1):
+        self._key_count += count
 
     # ── Activity Score (Anti-AutoClicker) ────────────────────
 
@@ -55,31 +67,36 @@ class ActivityTracker:
           30-69  = Suspicious (flagged for HR)
           0-29   = Likely auto-clicker
         Resets counters after calculation (called each heartbeat).
+        Calls within _SCORE_REUSE_SEC of the last one return its score.
         """
-        click_times = list(self._click_times)
-        click_positions = list(self._click_positions)
-        move_positions = list(self._move_positions)
-        key_count = self._key_count
-        mouse_count = self._mouse_count
-        scroll_count = self._scroll_count
-
-        self._key_count = 0
-        self._mouse_count = 0
-        self._scroll_count = 0
+        now = time.monotonic()
+        if self._last_score_at is not None and now - self._last_score_at < _SCORE_REUSE_SEC:
+            return self._last_score
+        self._last_score_at = now
+
+        # Snapshot-and-reset without a lock: the pynput threads never touch
+        # these counters — they only feed the input queue, which the main
+        # thread drains before it ever gets here.
+        key_count, mouse_count, scroll_count = (
+            self._key_count, self._mouse_count, self._scroll_count,
+        )
+        self._key_count = self._mouse_count = self._scroll_count = 0
 
         total_events = key_count + mouse_count + scroll_count
 
-        if total_events == 0 and len(click_times) < 3:
-            self._last_score = 100
-            return 100
-
-        density = _score_density(total_events)
-        intervals = _score_click_intervals(click_times)
-        positions = _score_position_diversity(click_positions)
-        mix = _score_input_mix(key_count, scroll_count, total_events)
-        movement = _score_movement_naturalness(move_positions)
-
-        total = density + intervals + positions + mix + movement
+        # No input since the last score: the buffers are unchanged, so the
+        # previous result still stands (100 before any input at all). Also
+        # keeps input pynput can't see (elevated windows) from being scored
+        # as a zero-density window.
+        if total_events == 0:
+            return self._last_score
+
+        # The core reads the ring buffers in place — nothing else can append
+        # while we run (main thread only), so no snapshot copies are needed.
+        total = _score_core(
+            self._click_intervals, self._click_positions, self._move_positions,
+            key_count, scroll_count, total_events,
+        )
         self._last_score = total
         return total
 
@@ -90,6 +107,18 @@ class ActivityTracker:
 
 # ─── Scoring helpers (pure functions, no state) ──────────────
 
+def _score_core(click_intervals, click_positions, move_positions,
+                key_count, scroll_count, total_events):
+    """Sum of the five signals (0-20 each). Pure: no tracker state."""
+    return (
+        _score_density(total_events)
+        + _score_click_intervals(click_intervals)
+        + _score_position_diversity(click_positions)
+        + _score_input_mix(key_count, scroll_count, total_events)
+        + _score_movement_naturalness(move_positions)
+    )
+
+
 def _score_density(total_events):
     """Real work = 30+ events/3min. Auto-clickers = 1-2."""
     if total_events < 3:
@@ -103,50 +132,24 @@ def _score_density(total_events):
     return 20
 
 
-def _score_click_intervals(click_times):
+def _score_click_intervals(click_intervals):
     """Real humans have random intervals. Auto-clickers are perfectly timed."""
-    if len(click_times) < 3:
+    if len(click_intervals) < 2:
         return 20
-    intervals = [click_times[i] - click_times[i - 1] for i in range(1, len(click_times))]
-    if not intervals:
-        return 20
-    mean = sum(intervals) / len(intervals)
+    mean, std = _mean_std(click_intervals)
     if mean <= 0:
         return 20
-    variance = sum((i - mean) ** 2 for i in intervals) / len(intervals)
-    cv = math.sqrt(variance) / mean
-    if cv < 0.05:
-        return 0
-    if cv < 0.10:
-        return 4
-    if cv < 0.15:
-        return 8
-    if cv < 0.20:
-        return 12
-    if cv < 0.30:
-        return 16
-    return 20
+    cv = std / mean
+    return _ladder_score(cv, _INTERVAL_CV_LADDER)
 
 
 def _score_position_diversity(click_positions):
     """Real humans click many positions. Auto-clickers repeat same spot."""
     if len(click_positions) < 3:
         return 20
-    unique = set()
-    for x, y in click_positions:
-        unique.add((x // 20, y // 20))
+    unique = {(x // 20, y // 20) for x, y in click_positions}
     diversity = len(unique) / len(click_positions)
-    if diversity < 0.05:
-        return 0
-    if diversity < 0.10:
-        return 4
-    if diversity < 0.20:
-        return 8
-    if diversity < 0.40:
-        return 12
-    if diversity < 0.60:
-        return 16
-    return 20
+    return _ladder_score(diversity, _DIVERSITY_LADDER)
 
 
 def _score_input_mix(key_count, scroll_count, total_events):
@@ -158,37 +161,50 @@ def _score_input_mix(key_count, scroll_count, total_events):
     if key_count == 0:
         return 6
     ratio = key_count / total_events
-    if ratio < 0.05:
-        return 10
-    if ratio < 0.10:
-        return 15
-    return 20
+    return _ladder_score(ratio, _KEY_RATIO_LADDER)
 
 
 def _score_movement_naturalness(move_positions):
     """Real mouse movement has curves. Auto-clickers teleport linearly."""
     if len(move_positions) < 5:
         return 20
-    speeds = []
-    for i in range(1, len(move_positions)):
-        x1, y1, t1 = move_positions[i - 1]
-        x2, y2, t2 = move_positions[i]
-        dist = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-        dt = max(t2 - t1, 0.001)
-        speeds.append(dist / dt)
-    if not speeds:
-        return 20
-    mean = sum(speeds) / len(speeds)
+    speeds = (
+        math.hypot(x2 - x1, y2 - y1) / max(t2 - t1, 0.001)
+        for (x1, y1, t1), (x2, y2, t2) in zip(move_positions, islice(move_positions, 1, None))
+    )
+    mean, std = _mean_std(speeds)
     if mean <= 0:
         return 20
-    variance = sum((s - mean) ** 2 for s in speeds) / len(speeds)
-    cv = math.sqrt(variance) / mean
-    if cv < 0.05:
-        return 0
-    if cv < 0.10:
-        return 4
-    if cv < 0.20:
-        return 10
-    if cv < 0.30:
-        return 15
-    return 20
+    cv = std / mean
+    return _ladder_score(cv, _SPEED_CV_LADDER)
+
+
+def _mean_std(values):
+    """Population mean and std in one pass (Welford). (0.0, 0.0) if empty."""
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in values:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+    if n == 0:
+        return 0.0, 0.0
+    return mean, math.sqrt(m2 / n)
+
+
+# ─── Score ladders (threshold table + bisect) ────────────────
+# Each ladder is piecewise-constant: (upper bounds, scores) where
+# scores[k] applies while value < bounds[k]; scores[-1] past the last bound.
+# bisect_right finds the step with one C call instead of an if-chain.
+
+_INTERVAL_CV_LADDER = ((0.05, 0.10, 0.15, 0.20, 0.30), (0, 4, 8, 12, 16, 20))
+_DIVERSITY_LADDER = ((0.05, 0.10, 0.20, 0.40, 0.60), (0, 4, 8, 12, 16, 20))
+_KEY_RATIO_LADDER = ((0.05, 0.10), (10, 15, 20))
+_SPEED_CV_LADDER = ((0.05, 0.10, 0.20, 0.30), (0, 4, 10, 15, 20))
+
+
+def _ladder_score(value, ladder):
+    bounds, scores = ladder
+    return scores[bisect_right(bounds, value)]
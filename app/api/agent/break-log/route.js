@@ -5,6 +5,10 @@
 //   Step 2 — PATCH: Form submitted → update reason on the open break (action: "update-reason")
 //   Step 3 — PATCH: Employee becomes ACTIVE → close break (endedAt = now) (action: "end-break")
 //
+// Agents send one Idempotency-Key for all three steps of a break, so a step
+// resent after a lost response (retry / offline replay) is acknowledged
+// without opening a duplicate break or touching a newer one.
+//
 // This captures the FULL idle time: from form appearing to actual work resuming.
 // Final persisted categories are strictly: Official, General, Namaz.
 
@@ -65,6 +69,18 @@ export async function POST(request) {
       return NextResponse.json({ error: 'Device not found or invalid token' }, { status: 401 });
     }
 
+    const idempotencyKey = request.headers.get('idempotency-key');
+    if (idempotencyKey) {
+      const existing = await BreakLog.findOne({ deviceId, idempotencyKey }).select('_id').lean();
+      if (existing) {
+        return NextResponse.json({
+          ok: true,
+          breakLogId: existing._id,
+          message: 'Break already opened',
+        });
+      }
+    }
+
     // Get employee info (includes shift fields for window clipping)
     const emp = await Employee.findOne({ empCode: empCode.trim() })
       .select('name department shift shiftId')
@@ -121,6 +137,7 @@ export async function POST(request) {
       endedAt: null,                            // OPEN — waiting for employee to become ACTIVE
       durationMin: 0,
       deviceId,
+      idempotencyKey: idempotencyKey || undefined,
     });
 
     return NextResponse.json({
@@ -160,6 +177,29 @@ export async function PATCH(request) {
     // Find the open break for this employee
     const openBreak = await BreakLog.findOne({ empCode: empCode.trim(), endedAt: null });
 
+    // A keyed step only ever applies to the break it was created for.
+    // Resent for a break that is already closed → acknowledge it; for any
+    // other break → refuse, never touch the one that happens to be open.
+    // (Open breaks without a key predate keys and are matched as before.)
+    const idempotencyKey = request.headers.get('idempotency-key');
+    if (idempotencyKey && openBreak?.idempotencyKey !== idempotencyKey) {
+      const closed = await BreakLog.findOne({ deviceId, idempotencyKey, endedAt: { $ne: null } })
+        .select('_id').lean();
+      if (closed) {
+        return NextResponse.json({
+          ok: true,
+          message: 'Break already closed',
+          breakLogId: closed._id,
+        });
+      }
+      if (openBreak?.idempotencyKey) {
+        return NextResponse.json(
+          { error: 'Idempotency-Key does not match the open break' },
+          { status: 409 }
+        );
+      }
+    }
+
     if (!openBreak) {
       return NextResponse.json(
         { error: 'No open break found for this employee' },
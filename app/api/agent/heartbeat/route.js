@@ -11,6 +11,10 @@ import SuspiciousLog from '@/models/SuspiciousLog';
 import { verifyToken } from '@/lib/security/tokens';
 import { resolveShiftWindow } from '@/lib/shift/resolveShiftWindow';
 
+// How many recent Idempotency-Key values are kept per device. Covers the
+// heartbeats an agent can buffer and replay after a short outage.
+const HEARTBEAT_KEY_WINDOW = 20;
+
 function floorToMinute(date) {
   const d = new Date(date);
   d.setSeconds(0, 0);
@@ -62,6 +66,24 @@ export async function POST(request) {
       );
     }
 
+    // ── Drop resent heartbeats (lost response, offline replay) ──
+    const idempotencyKey = request.headers.get('idempotency-key');
+    const recentKeys = device.recentHeartbeatKeys || [];
+    if (idempotencyKey && recentKeys.includes(idempotencyKey)) {
+      return NextResponse.json({ ok: true, action: 'duplicate' });
+    }
+    // The key is recorded only once every write below has succeeded, so a
+    // heartbeat that fails part-way (500) stays retryable under the same key.
+    const ack = async (payload) => {
+      if (idempotencyKey) {
+        await Device.updateOne(
+          { _id: device._id },
+          { $push: { recentHeartbeatKeys: { $each: [idempotencyKey], $slice: -HEARTBEAT_KEY_WINDOW } } }
+        );
+      }
+      return NextResponse.json(payload);
+    };
+
     // ── Update device status + activity score ────────────────
     const now = new Date();
     device.lastSeenAt = now;
@@ -90,7 +112,7 @@ export async function POST(request) {
       shiftWindow = await resolveShiftWindow(empCode, now);
     } catch (err) {
       // If no shift found, still accept heartbeat (device is alive)
-      return NextResponse.json({
+      return ack({
         ok: true,
         warning: err.message,
         attendance: null,
@@ -141,7 +163,7 @@ export async function POST(request) {
     if (!attendance) {
       // Before shift start: don't create attendance/check-in yet.
       if (!canCheckInNow) {
-        return NextResponse.json({
+        return ack({
           ok: true,
           action: 'before-shift',
           attendance: null,
@@ -168,7 +190,7 @@ export async function POST(request) {
         earlyLeave: false,
       });
 
-      return NextResponse.json({
+      return ack({
         ok: true,
         action: 'checked-in',
         attendance: {
@@ -193,7 +215,7 @@ export async function POST(request) {
       attendance.totalPunches = (attendance.totalPunches || 0) + 1;
       await attendance.save();
 
-      return NextResponse.json({
+      return ack({
         ok: true,
         action: 'checked-in',
         attendance: {
@@ -210,7 +232,7 @@ export async function POST(request) {
     // Strict start boundary: do not accumulate attendance score/suspicious
     // minutes before shift start.
     if (now < shiftStart) {
-      return NextResponse.json({
+      return ack({
         ok: true,
         action: 'before-shift',
         attendance: {
@@ -249,7 +271,7 @@ export async function POST(request) {
       await attendance.save();
     }
 
-    return NextResponse.json({
+    return ack({
       ok: true,
       action: 'heartbeat-ack',
       attendance: {
@@ -62,6 +62,9 @@ const BreakLogSchema = new mongoose.Schema(
     deviceId: {
       type: String,
     },
+    idempotencyKey: {
+      type: String, // agent's per-break key; shared by all 3 steps
+    },
   },
   { timestamps: true }
 );
@@ -72,6 +75,8 @@ BreakLogSchema.index({ empCode: 1, date: -1 }, { background: true });
 BreakLogSchema.index({ date: 1, department: 1 }, { background: true });
 // Find open breaks (endedAt is null)
 BreakLogSchema.index({ empCode: 1, endedAt: 1 }, { background: true });
+// Recognise resent agent calls (retry / offline replay)
+BreakLogSchema.index({ deviceId: 1, idempotencyKey: 1 }, { background: true, sparse: true });
 
 export default mongoose.models.BreakLog ||
   mongoose.model('BreakLog', BreakLogSchema);
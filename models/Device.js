@@ -45,6 +45,10 @@ const DeviceSchema = new mongoose.Schema(
       type: Number,
       default: 0,
     },
+    recentHeartbeatKeys: {
+      type: [String], // last few Idempotency-Key values, to drop resent heartbeats
+      default: [],
+    },
     flagged: {
       type: Boolean,
       default: false,